@@ -1,7 +1,10 @@
 import csv
 import itertools
+import math
 import sys
 
+import numpy as np
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -40,59 +43,106 @@ PROBS = {
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    log_space = "--log" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--log"]
+    if len(args) not in [1, 2]:
+        sys.exit("Usage: python heredity.py data.csv [engine] [--log]")
+    engine = args[1] if len(args) == 2 else "eliminate"
+    if engine not in ENGINES:
+        sys.exit(f"Engine must be one of: {', '.join(ENGINES)}")
+    people = load_data(args[0])
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+    # Compute gene and trait probabilities for each person, in log space
+    # if asked, so that large families do not underflow
+    if engine in SAMPLERS:
+        probabilities, diagnostics = SAMPLERS[engine](people,
+                                                      log_space=log_space)
+        print(f"Samples: {diagnostics['samples']}, "
+              f"effective: {diagnostics['effective_samples']:.0f}")
+        print(f"Largest standard error: {diagnostics['standard_error']:.4f}")
+        if "r_hat" in diagnostics:
+            print(f"Largest R-hat: {diagnostics['r_hat']:.4f}")
+    else:
+        try:
+            probabilities = ENGINES[engine](people, log_space=log_space)
+        except ValueError as error:
+            sys.exit(str(error))
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def empty_probabilities(people, value=0):
+    """
+    Return a dictionary of gene and trait distributions for each person,
+    with every probability set to `value`.
+    """
+    return {
         person: {
             "gene": {
-                2: 0,
-                1: 0,
-                0: 0
+                2: value,
+                1: value,
+                0: value
             },
             "trait": {
-                True: 0,
-                False: 0
+                True: value,
+                False: value
             }
         }
         for person in people
     }
 
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+def enumerate_probabilities(people, log_space=False):
+    """
+    Return normalized gene and trait distributions for each person by
+    summing the joint probability of every assignment of genes and traits
+    that agrees with the known traits, or if `log_space` is True, by
+    accumulating log joint probabilities with log-sum-exp.
+    """
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+    # Keep track of gene and trait probabilities for each person
+    probabilities = empty_probabilities(people,
+                                        -math.inf if log_space else 0)
+    smallest = 1
+
+    # Loop over all sets of people who might have the trait, taking
+    # known traits as given rather than generating sets that violate them
+    names = set(people)
+    known = {person for person in names if people[person]["trait"]}
+    unknown = {person for person in names if people[person]["trait"] is None}
+    for unknown_trait in powerset(unknown):
+        have_trait = known | unknown_trait
 
         # Loop over all sets of people who might have the gene
         for one_gene in powerset(names):
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+                if log_space:
+                    p = log_joint_probability(people, one_gene, two_genes,
+                                              have_trait)
+                    log_update(probabilities, one_gene, two_genes,
+                               have_trait, p)
+                else:
+                    p = joint_probability(people, one_gene, two_genes,
+                                          have_trait)
+                    update(probabilities, one_gene, two_genes, have_trait, p)
+                    smallest = min(smallest, p)
 
     # Ensure probabilities sum to 1
-    normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    if log_space:
+        log_normalize(probabilities)
+    else:
+        check_underflow(smallest)
+        normalize(probabilities)
+    return probabilities
 
 
 def load_data(filename):
@@ -119,14 +169,36 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Yield every possible subset of set s, one at a time.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
+
+
+def submasks(mask):
+    """
+    Yield every bitmask whose set bits are a subset of those of `mask`.
+    """
+    submask = mask
+    while True:
+        yield submask
+        if submask == 0:
+            return
+        submask = (submask - 1) & mask
+
+
+def gene_assignments(n):
+    """
+    Yield every assignment of gene counts to `n` people as bitmasks
+    `(one_gene, two_genes)`, in which bit `i` stands for the `i`th person.
+    """
+    everyone = (1 << n) - 1
+    for one_gene in submasks(everyone):
+        for two_genes in submasks(everyone & ~one_gene):
+            yield one_gene, two_genes
 
 
 def num_of_genes(person, one_gene, two_genes):
@@ -270,6 +342,11 @@ def normalize(probabilities):
     for person in probabilities:
         sum_trait = sum(probabilities[person]["trait"].values())
         sum_gene = sum(probabilities[person]["gene"].values())
+        if sum_trait == 0 or sum_gene == 0:
+            raise FloatingPointError(
+                f"Probabilities for {person} underflowed to 0; "
+                "use log space"
+            )
 
         for gene in probabilities[person]["gene"]:
             probabilities[person]["gene"][gene] = probabilities[person]["gene"][gene] / sum_gene
@@ -278,5 +355,823 @@ def normalize(probabilities):
             probabilities[person]["trait"][trait] = probabilities[person]["trait"][trait] / sum_trait
 
 
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute and return the logarithm of the joint probability computed by
+    `joint_probability`, as a sum of logarithms that does not underflow.
+    """
+    log_probability = 0
+    for person in people:
+        gene_count = num_of_genes(person, one_gene, two_genes)
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None and father is None:
+            log_probability += LOG_GENE[gene_count]
+        else:
+            log_probability += LOG_TRANSMISSION[
+                num_of_genes(mother, one_gene, two_genes),
+                num_of_genes(father, one_gene, two_genes),
+                gene_count
+            ]
+        log_probability += LOG_TRAIT[gene_count, int(person in have_trait)]
+    return float(log_probability)
+
+
+def log_update(probabilities, one_gene, two_genes, have_trait, log_p):
+    """
+    Add to `probabilities`, holding log probabilities, a new joint
+    probability given by its logarithm `log_p`, using log-sum-exp.
+    """
+    for person in probabilities:
+        gene_count = num_of_genes(person, one_gene, two_genes)
+        has_trait = person in have_trait
+        distributions = probabilities[person]
+        distributions["gene"][gene_count] = log_add(
+            distributions["gene"][gene_count], log_p
+        )
+        distributions["trait"][has_trait] = log_add(
+            distributions["trait"][has_trait], log_p
+        )
+
+
+def log_normalize(probabilities):
+    """
+    Update `probabilities`, holding log probabilities, to normalized
+    probabilities, scaling each distribution by its largest value first so
+    that none of them underflows.
+    """
+    for person in probabilities:
+        for distribution in probabilities[person].values():
+            largest = max(distribution.values())
+            for value in distribution:
+                distribution[value] = math.exp(distribution[value] - largest)
+    normalize(probabilities)
+
+
+def log_add(a, b):
+    """
+    Return log(exp(a) + exp(b)) without leaving log space.
+    """
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+def logsumexp(a, axis=None):
+    """
+    Return log(sum(exp(a))) along `axis` of the array `a` without leaving
+    log space.
+    """
+    largest = np.max(a, axis=axis, keepdims=True)
+    largest = np.where(np.isfinite(largest), largest, 0)
+    with np.errstate(divide="ignore"):
+        total = np.log(np.sum(np.exp(a - largest), axis=axis, keepdims=True))
+    total = total + largest
+    return total.item() if axis is None else np.squeeze(total, axis=axis)
+
+
+def check_underflow(p):
+    """
+    Raise a FloatingPointError if any of the probabilities `p`, which the
+    model never makes 0, has fallen below the smallest normal float, where
+    floats lose precision before underflowing to 0.
+    """
+    if np.min(p) < TINY:
+        raise FloatingPointError("Probabilities underflowed; use log space")
+
+
+def transmission_table():
+    """
+    Return a 3x3x3 array whose entry `[mother, father, child]` is the
+    probability that a child has `child` copies of the gene given that
+    their parents have `mother` and `father` copies.
+    """
+
+    # Probability that a parent with each number of copies passes one on
+    passes = np.array([PROBS["mutation"], 0.5, 1 - PROBS["mutation"]])
+    mother = passes[:, np.newaxis]
+    father = passes[np.newaxis, :]
+    return np.stack([
+        (1 - mother) * (1 - father),
+        mother * (1 - father) + (1 - mother) * father,
+        mother * father
+    ], axis=-1)
+
+
+def trait_table():
+    """
+    Return a 3x3 array whose entry `[gene, trait]` is the probability that
+    a person with `gene` copies of the gene has the trait if `trait` is 1,
+    or does not have it if `trait` is 0. Entries with `trait` 2, which can
+    also be indexed as -1, are 1, for a trait that is summed over.
+    """
+    return np.array([
+        [PROBS["trait"][gene][False], PROBS["trait"][gene][True], 1]
+        for gene in range(3)
+    ])
+
+
+# Lookup tables built from PROBS, indexed by gene counts and traits
+GENE = np.array([PROBS["gene"][gene] for gene in range(3)])
+TRANSMISSION = transmission_table()
+TRAIT = trait_table()
+
+# The same tables in log space
+LOG_GENE = np.log(GENE)
+LOG_TRANSMISSION = np.log(TRANSMISSION)
+LOG_TRAIT = np.log(TRAIT)
+
+# Smallest positive normal float, below which probabilities have underflowed
+TINY = np.finfo(float).tiny
+
+# Number of assignments scored at once by the vectorized engine
+BATCH_SIZE = 2 ** 16
+
+# Largest clique table, in entries, that variable elimination will build
+MAX_CLIQUE_SIZE = 3 ** 13
+
+
+def pedigree_factors(people, log_space=False):
+    """
+    Return the factors of the Bayesian network for a family, as a list of
+    `(variables, values)` pairs, where `variables` is a tuple of names
+    whose gene counts index the array `values`, of log probabilities if
+    `log_space` is True.
+
+    Each person contributes the distribution of their gene count, given
+    their parents' if known, and each known trait contributes its
+    likelihood given the person's gene count.
+    """
+    gene, transmission, traits = (
+        (LOG_GENE, LOG_TRANSMISSION, LOG_TRAIT) if log_space
+        else (GENE, TRANSMISSION, TRAIT)
+    )
+    factors = []
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None and father is None:
+            factors.append(((person,), gene))
+        else:
+            factors.append(((mother, father, person), transmission))
+
+        trait = people[person]["trait"]
+        if trait is not None:
+            factors.append(((person,), traits[:, int(trait)]))
+    return factors
+
+
+def elimination_order(people, factors):
+    """
+    Return an order in which to eliminate everyone's gene count, chosen
+    greedily so that each step connects the fewest remaining people, and
+    a dictionary mapping each person to their clique: the tuple of
+    themselves and the people still connected to them when they are
+    eliminated.
+    """
+    neighbors = {person: set() for person in people}
+    for variables, _ in factors:
+        for person in variables:
+            neighbors[person].update(variables)
+            neighbors[person].discard(person)
+
+    order = []
+    cliques = dict()
+    remaining = set(people)
+    while remaining:
+        person = min(remaining, key=lambda p: (len(neighbors[p]), p))
+        cliques[person] = (person,) + tuple(sorted(neighbors[person]))
+        for neighbor in neighbors[person]:
+            neighbors[neighbor].update(neighbors[person])
+            neighbors[neighbor].discard(neighbor)
+            neighbors[neighbor].discard(person)
+        remaining.remove(person)
+        order.append(person)
+    return order, cliques
+
+
+def multiply(factors, eliminate=(), log_space=False):
+    """
+    Return the product of `factors`, summing out the variables in
+    `eliminate`. If `log_space` is True, factors hold log probabilities,
+    so products are sums and sums are taken with log-sum-exp.
+    """
+    variables = []
+    for factor_variables, _ in factors:
+        for variable in factor_variables:
+            if variable not in variables:
+                variables.append(variable)
+
+    product = (np.zeros if log_space else np.ones)([1] * len(variables))
+    for factor_variables, values in factors:
+
+        # Line up the factor's axes with the product's
+        axes = sorted(range(len(factor_variables)),
+                      key=lambda i: variables.index(factor_variables[i]))
+        shape = [3 if variable in factor_variables else 1
+                 for variable in variables]
+        values = values.transpose(axes).reshape(shape)
+        product = product + values if log_space else product * values
+
+    if eliminate:
+        axes = tuple(variables.index(variable) for variable in eliminate)
+        if log_space:
+            product = logsumexp(product, axis=axes)
+        else:
+            product = product.sum(axis=axes)
+        variables = [variable for variable in variables
+                     if variable not in eliminate]
+    return tuple(variables), product
+
+
+def propagate(factors, order, cliques, log_space=False):
+    """
+    Return a dictionary mapping each person to the normalized distribution
+    of their gene count, by passing messages once up and once down the
+    tree of cliques formed by eliminating people in `order`.
+
+    Each factor belongs to the clique of the first of its people to be
+    eliminated, and each clique's parent is the clique of the first of its
+    other people to be eliminated. The upward pass is variable elimination;
+    the downward pass sends each clique the rest of the family's evidence,
+    so that every marginal comes from a single sweep.
+    """
+    position = {person: i for i, person in enumerate(order)}
+    parents = dict()
+    children = {person: [] for person in order}
+    for person in order:
+        if len(cliques[person]) > 1:
+            parents[person] = min(cliques[person][1:], key=position.get)
+            children[parents[person]].append(person)
+
+    assigned = {person: [] for person in order}
+    for factor in factors:
+        assigned[min(factor[0], key=position.get)].append(factor)
+
+    # Upward pass: each clique sums out its own person for its parent
+    potentials = dict()
+    messages = dict()
+    for person in order:
+        potentials[person] = multiply(
+            assigned[person] + [messages[child] for child in children[person]],
+            log_space=log_space
+        )
+        if person in parents:
+            messages[person] = multiply([potentials[person]],
+                                        eliminate=[person],
+                                        log_space=log_space)
+            if not log_space:
+                check_underflow(messages[person][1])
+
+    # Downward pass: each clique's belief is its potential times what its
+    # parent's belief says about their shared people, less its own message
+    beliefs = dict()
+    distributions = dict()
+    for person in reversed(order):
+        belief = potentials[person]
+        if person in parents:
+            separator, message = messages[person]
+            parent_variables, parent_belief = beliefs[parents[person]]
+            inverse = -message if log_space else 1 / message
+            belief = multiply([belief, multiply(
+                [(parent_variables, parent_belief), (separator, inverse)],
+                eliminate=[variable for variable in parent_variables
+                           if variable not in separator],
+                log_space=log_space
+            )], log_space=log_space)
+        beliefs[person] = belief
+
+        variables = belief[0]
+        _, distribution = multiply(
+            [belief], eliminate=[v for v in variables if v != person],
+            log_space=log_space
+        )
+        if log_space:
+            distribution = np.exp(distribution - distribution.max())
+        else:
+            check_underflow(distribution)
+        distributions[person] = distribution / distribution.sum()
+    return distributions
+
+
+def eliminate_probabilities(people, log_space=False):
+    """
+    Return normalized gene and trait distributions for each person by
+    variable elimination over the family's Bayesian network, giving the
+    same results as `enumerate_probabilities`.
+
+    Time and memory grow exponentially in the width of the elimination
+    order, the largest clique it forms, rather than in the size of the
+    family, so this is fast for family trees but not for pedigrees with
+    many intermarriages, for which it raises a ValueError pointing to
+    the Gibbs sampling engine.
+    """
+    factors = pedigree_factors(people, log_space)
+    order, cliques = elimination_order(people, factors)
+    width = max((len(clique) for clique in cliques.values()), default=0)
+    if 3 ** width > MAX_CLIQUE_SIZE:
+        raise ValueError(
+            f"Exact inference would need tables of 3^{width} entries for "
+            "this family; use the gibbs engine instead"
+        )
+
+    distributions = propagate(factors, order, cliques, log_space)
+    genes = np.array([distributions[person] for person in people])
+    return gene_probabilities(people, genes)
+
+
+def gene_probabilities(people, genes):
+    """
+    Return gene and trait distributions for each person from an array
+    `genes` with a row per person, in the order of `people`, holding the
+    normalized distribution of their gene count. A known trait is certain,
+    and an unknown trait follows from the person's gene count.
+    """
+    probabilities = empty_probabilities(people)
+    for i, person in enumerate(people):
+        for gene in range(3):
+            probabilities[person]["gene"][gene] = float(genes[i, gene])
+
+        trait = people[person]["trait"]
+        for value in [True, False]:
+            if trait is None:
+                probabilities[person]["trait"][value] = float(
+                    genes[i] @ TRAIT[:, int(value)]
+                )
+            else:
+                probabilities[person]["trait"][value] = float(trait == value)
+    return probabilities
+
+
+def bitmask_probabilities(people, log_space=False):
+    """
+    Return normalized gene and trait distributions for each person by
+    enumerating gene assignments as bitmasks.
+
+    Known traits are folded into the probability of each gene count, and
+    unknown traits are never enumerated: for any gene count, a person's
+    trait probabilities sum to 1, so summing over their traits leaves the
+    probability of the gene assignment, and their chance of having the
+    trait is that times the probability of the trait given their genes.
+
+    If `log_space` is True, log probabilities are summed and accumulated
+    with log-sum-exp instead.
+    """
+    names = list(people)
+    index = {person: i for i, person in enumerate(names)}
+    if log_space:
+        gene, transmission, traits = LOG_GENE, LOG_TRANSMISSION, LOG_TRAIT
+        combine = np.add
+    else:
+        gene, transmission, traits = GENE, TRANSMISSION, TRAIT
+        combine = np.multiply
+
+    # Probability of each person's gene count given their parents', and
+    # of their trait if known
+    factors = []
+    for person in names:
+        trait = people[person]["trait"]
+        evidence = traits[:, -1 if trait is None else int(trait)]
+        if people[person]["mother"] is None:
+            factors.append(combine(gene, evidence).tolist())
+        else:
+            mother = index[people[person]["mother"]]
+            father = index[people[person]["father"]]
+            factors.append((mother, father,
+                            combine(transmission, evidence).tolist()))
+
+    gene_sums = [[-math.inf if log_space else 0] * 3 for _ in names]
+    smallest = 1
+    for one_gene, two_genes in gene_assignments(len(names)):
+        counts = [(one_gene >> i & 1) + 2 * (two_genes >> i & 1)
+                  for i in range(len(names))]
+        values = [
+            factor[count] if isinstance(factor, list)
+            else factor[2][counts[factor[0]]][counts[factor[1]]][count]
+            for count, factor in zip(counts, factors)
+        ]
+        if log_space:
+            p = sum(values)
+            for i, count in enumerate(counts):
+                gene_sums[i][count] = log_add(gene_sums[i][count], p)
+        else:
+            p = math.prod(values)
+            for i, count in enumerate(counts):
+                gene_sums[i][count] += p
+            if p < smallest:
+                smallest = p
+
+    if log_space:
+        gene_sums = [[math.exp(value - max(sums)) for value in sums]
+                     for sums in gene_sums]
+    else:
+        check_underflow(smallest)
+
+    probabilities = empty_probabilities(people)
+    for i, person in enumerate(names):
+        trait = people[person]["trait"]
+        for gene in range(3):
+            probabilities[person]["gene"][gene] = gene_sums[i][gene]
+            for value in [True, False]:
+                if trait is None:
+                    probabilities[person]["trait"][value] += (
+                        gene_sums[i][gene] * PROBS["trait"][gene][value]
+                    )
+                else:
+                    probabilities[person]["trait"][value] += (
+                        gene_sums[i][gene] * (trait == value)
+                    )
+    normalize(probabilities)
+    return probabilities
+
+
+def batch_joint_probability(people, genes, have_trait, log_space=False):
+    """
+    Compute and return the joint probabilities of a batch of assignments,
+    or their logarithms if `log_space` is True.
+
+    `genes` and `have_trait` are integer arrays with one row per assignment
+    and one column per person, in the order of `people`, giving each
+    person's number of copies of the gene and 1 if they have the trait or
+    0 if not. A trait of -1 is summed over, leaving the probability of the
+    rest of the assignment.
+    """
+    names = list(people)
+    index = {person: i for i, person in enumerate(names)}
+    founders = [i for i, person in enumerate(names)
+                if people[person]["mother"] is None]
+    children = [i for i, person in enumerate(names)
+                if people[person]["mother"] is not None]
+    mothers = [index[people[names[i]]["mother"]] for i in children]
+    fathers = [index[people[names[i]]["father"]] for i in children]
+
+    if log_space:
+        return (
+            LOG_GENE[genes[:, founders]].sum(axis=1)
+            + LOG_TRANSMISSION[genes[:, mothers], genes[:, fathers],
+                               genes[:, children]].sum(axis=1)
+            + LOG_TRAIT[genes, have_trait].sum(axis=1)
+        )
+    return (
+        GENE[genes[:, founders]].prod(axis=1)
+        * TRANSMISSION[genes[:, mothers], genes[:, fathers],
+                       genes[:, children]].prod(axis=1)
+        * TRAIT[genes, have_trait].prod(axis=1)
+    )
+
+
+def batch_update(gene_sums, trait_sums, genes, have_trait, p,
+                 log_space=False):
+    """
+    Add to the arrays `gene_sums` and `trait_sums`, with one row per person
+    and a column per gene count or per trait (0 or 1), the joint
+    probabilities `p` of a batch of assignments as given to
+    `batch_joint_probability`. A trait that is summed over adds the chance
+    of the trait given the person's gene count.
+
+    If `log_space` is True, the sums and `p` are logarithms, and are added
+    with log-sum-exp.
+    """
+    if log_space:
+        for gene in range(3):
+            gene_sums[:, gene] = np.logaddexp(gene_sums[:, gene], logsumexp(
+                np.where(genes == gene, p[:, np.newaxis], -np.inf), axis=0
+            ))
+        for trait in [0, 1]:
+            log_trait = np.where(have_trait == -1, LOG_TRAIT[genes, trait],
+                                 np.where(have_trait == trait, 0, -np.inf))
+            trait_sums[:, trait] = np.logaddexp(
+                trait_sums[:, trait],
+                logsumexp(p[:, np.newaxis] + log_trait, axis=0)
+            )
+        return
+
+    for gene in range(3):
+        gene_sums[:, gene] += p @ (genes == gene)
+    has_trait = np.where(have_trait == -1, TRAIT[genes, 1], have_trait == 1)
+    trait_sums[:, 1] += p @ has_trait
+    trait_sums[:, 0] += p @ (1 - has_trait)
+
+
+def vectorized_probabilities(people, log_space=False):
+    """
+    Return normalized gene and trait distributions for each person by
+    scoring every gene assignment in batches of NumPy arrays, with known
+    traits as evidence and unknown traits summed over, in log space if
+    `log_space` is True.
+    """
+    n = len(people)
+    have_trait = np.array([
+        -1 if people[person]["trait"] is None else int(people[person]["trait"])
+        for person in people
+    ])
+    powers = 3 ** np.arange(n)
+
+    gene_sums = np.full((n, 3), -np.inf if log_space else 0.0)
+    trait_sums = np.full((n, 2), -np.inf if log_space else 0.0)
+    for start in range(0, 3 ** n, BATCH_SIZE):
+        assignments = np.arange(start, min(start + BATCH_SIZE, 3 ** n))
+        genes = assignments[:, np.newaxis] // powers % 3
+        traits = np.broadcast_to(have_trait, genes.shape)
+        p = batch_joint_probability(people, genes, traits, log_space)
+        if not log_space:
+            check_underflow(p)
+        batch_update(gene_sums, trait_sums, genes, traits, p, log_space)
+
+    if log_space:
+        gene_sums = np.exp(gene_sums - gene_sums.max(axis=1, keepdims=True))
+        trait_sums = np.exp(trait_sums - trait_sums.max(axis=1, keepdims=True))
+
+    probabilities = empty_probabilities(people)
+    for i, person in enumerate(people):
+        for gene in range(3):
+            probabilities[person]["gene"][gene] = float(gene_sums[i, gene])
+        for trait in [True, False]:
+            probabilities[person]["trait"][trait] = float(
+                trait_sums[i, int(trait)]
+            )
+    normalize(probabilities)
+    return probabilities
+
+
+def topological_order(people):
+    """
+    Return the indices of `people`, in the order of `people`, ordered so
+    that everyone comes after their parents.
+    """
+    names = list(people)
+    index = {person: i for i, person in enumerate(names)}
+    order = []
+    placed = set()
+
+    def place(person):
+        if person in placed:
+            return
+        placed.add(person)
+        for parent in ["mother", "father"]:
+            if people[person][parent] is not None:
+                place(people[person][parent])
+        order.append(index[person])
+
+    for person in names:
+        place(person)
+    return order
+
+
+def sample_categorical(rng, probabilities):
+    """
+    Return one sample from each row of `probabilities`, an array whose last
+    axis holds a distribution over gene counts.
+    """
+    cumulative = np.cumsum(probabilities, axis=-1)
+    u = rng.random(cumulative.shape[:-1]) * cumulative[..., -1]
+    return np.minimum((u[..., np.newaxis] > cumulative).sum(axis=-1), 2)
+
+
+def likelihood_weighting(people, samples=10 ** 6, target_error=None,
+                         batch_size=10 ** 4, seed=None):
+    """
+    Estimate gene and trait distributions for each person by likelihood
+    weighting: gene counts are sampled from parents to children, and each
+    sample is weighted by the likelihood of the known traits.
+
+    Samples are drawn `batch_size` at a time until `samples` have been
+    drawn, or until the largest standard error of a gene probability falls
+    to `target_error`. Return the distributions and a dictionary of
+    diagnostics: samples drawn, effective sample size, largest standard
+    error, and whether `target_error` was reached.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(people)
+    index = {person: i for i, person in enumerate(names)}
+    order = topological_order(people)
+    known = [i for i, person in enumerate(names)
+             if people[person]["trait"] is not None]
+    traits = np.array([int(people[names[i]]["trait"]) for i in known],
+                      dtype=int)
+
+    # Weighted sums, scaled by exp(-shift) to keep weights from underflowing
+    shift = -np.inf
+    weights = 0
+    squared_weights = 0
+    gene_sums = np.zeros((len(names), 3))
+    squared_gene_sums = np.zeros((len(names), 3))
+
+    drawn = 0
+    standard_error = np.inf
+    while drawn < samples:
+        size = min(batch_size, samples - drawn)
+        genes = np.empty((size, len(names)), dtype=int)
+        for i in order:
+            person = names[i]
+            if people[person]["mother"] is None:
+                distribution = GENE
+            else:
+                distribution = TRANSMISSION[
+                    genes[:, index[people[person]["mother"]]],
+                    genes[:, index[people[person]["father"]]]
+                ]
+            genes[:, i] = sample_categorical(
+                rng, np.broadcast_to(distribution, (size, 3))
+            )
+
+        log_weights = np.log(TRAIT[genes[:, known], traits]).sum(axis=1)
+        if log_weights.max() > shift:
+            scale = np.exp(shift - log_weights.max())
+            shift = log_weights.max()
+            weights *= scale
+            squared_weights *= scale ** 2
+            gene_sums *= scale
+            squared_gene_sums *= scale ** 2
+        w = np.exp(log_weights - shift)
+
+        weights += w.sum()
+        squared_weights += (w ** 2).sum()
+        for gene in range(3):
+            gene_sums[:, gene] += w @ (genes == gene)
+            squared_gene_sums[:, gene] += (w ** 2) @ (genes == gene)
+        drawn += size
+
+        # Standard error of each self-normalized estimate, by the delta method
+        mean = gene_sums / weights
+        variance = (squared_gene_sums * (1 - 2 * mean)
+                    + mean ** 2 * squared_weights)
+        standard_error = np.sqrt(np.maximum(variance, 0)).max() / weights
+        if target_error is not None and standard_error <= target_error:
+            break
+
+    probabilities = gene_probabilities(people, gene_sums / weights)
+    return probabilities, {
+        "samples": drawn,
+        "effective_samples": float(weights ** 2 / squared_weights),
+        "standard_error": float(standard_error),
+        "converged": bool(target_error is not None
+                          and standard_error <= target_error)
+    }
+
+
+def gibbs_sampling(people, sweeps=1000, chains=256, burn_in=100,
+                   target_error=None, check_every=50, seed=None,
+                   log_space=False):
+    """
+    Estimate gene and trait distributions for each person by Gibbs
+    sampling over gene counts, running `chains` independent chains at once
+    from samples of the prior.
+
+    Each sweep resamples every person's gene count given everyone else's,
+    and after `burn_in` sweeps adds each person's conditional distribution
+    to the estimate. Sampling stops after `sweeps` sweeps, or once the
+    largest standard error across chains falls to `target_error`, checked
+    every `check_every` sweeps. Return the distributions and a dictionary
+    of diagnostics: samples kept, effective sample size, largest standard
+    error and Gelman-Rubin R-hat, and whether `target_error` was reached.
+
+    If `log_space` is True, conditionals are built from log probabilities,
+    so that people with many children do not underflow.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(people)
+    index = {person: i for i, person in enumerate(names)}
+    parents = [
+        None if people[person]["mother"] is None else
+        (index[people[person]["mother"]], index[people[person]["father"]])
+        for person in names
+    ]
+    if log_space:
+        gene, transmission, traits = LOG_GENE, LOG_TRANSMISSION, LOG_TRAIT
+        combine = np.add
+    else:
+        gene, transmission, traits = GENE, TRANSMISSION, TRAIT
+        combine = np.multiply
+    evidence = [
+        traits[:, -1 if people[person]["trait"] is None
+               else int(people[person]["trait"])]
+        for person in names
+    ]
+
+    # Each child's table as a function of one parent's gene count, indexed
+    # by the other parent's and the child's gene counts
+    as_mother = transmission.transpose(1, 2, 0)
+    as_father = transmission.transpose(0, 2, 1)
+    children = [[] for _ in names]
+    for child, parent in enumerate(parents):
+        if parent is not None:
+            mother, father = parent
+            children[mother].append((child, father, as_mother))
+            children[father].append((child, mother, as_father))
+
+    # Start every chain from a sample of the prior
+    genes = np.empty((chains, len(names)), dtype=int)
+    for i in topological_order(people):
+        distribution = GENE if parents[i] is None else TRANSMISSION[
+            genes[:, parents[i][0]], genes[:, parents[i][1]]
+        ]
+        genes[:, i] = sample_categorical(
+            rng, np.broadcast_to(distribution, (chains, 3))
+        )
+
+    sums = np.zeros((chains, len(names), 3))
+    squares = np.zeros((chains, len(names), 3))
+    kept = 0
+    standard_error = np.inf
+    r_hat = np.inf
+    effective_samples = 0
+    for sweep in range(sweeps):
+        for i in range(len(names)):
+            if parents[i] is None:
+                conditional = np.broadcast_to(combine(gene, evidence[i]),
+                                              (chains, 3))
+            else:
+                mother, father = parents[i]
+                conditional = combine(
+                    transmission[genes[:, mother], genes[:, father]],
+                    evidence[i]
+                )
+            for child, other, table in children[i]:
+                conditional = combine(conditional,
+                                      table[genes[:, other], genes[:, child]])
+            if log_space:
+                conditional = np.exp(
+                    conditional - conditional.max(axis=1, keepdims=True)
+                )
+            conditional = conditional / conditional.sum(axis=1, keepdims=True)
+            genes[:, i] = sample_categorical(rng, conditional)
+            if sweep >= burn_in:
+                sums[:, i] += conditional
+                squares[:, i] += conditional ** 2
+
+        if sweep >= burn_in:
+            kept += 1
+        if kept > 1 and (kept % check_every == 0 or sweep == sweeps - 1):
+            standard_error, r_hat, effective_samples = chain_diagnostics(
+                sums, squares, kept
+            )
+            if target_error is not None and standard_error <= target_error:
+                break
+
+    if kept == 0:
+        raise ValueError("No sweeps kept after burn-in")
+    means = sums.mean(axis=0) / kept
+    return gene_probabilities(people, means), {
+        "samples": kept * chains,
+        "effective_samples": float(effective_samples),
+        "standard_error": float(standard_error),
+        "r_hat": float(r_hat),
+        "converged": bool(target_error is not None
+                          and standard_error <= target_error)
+    }
+
+
+def chain_diagnostics(sums, squares, kept):
+    """
+    Return the largest standard error, the largest Gelman-Rubin R-hat and
+    the smallest effective sample size over every gene probability, from
+    the sums and sums of squares per chain of the `kept` values estimating
+    it.
+    """
+    chains = len(sums)
+    means = sums / kept
+    between = means.var(axis=0, ddof=1)
+    standard_error = np.sqrt(between.max() / chains)
+
+    within = np.maximum(squares / kept - means ** 2, 0) * kept / (kept - 1)
+    within = within.mean(axis=0)
+    pooled = (kept - 1) / kept * within + between
+
+    # Probabilities that barely vary, like those of a founder with no
+    # children or known relatives, are exact and say nothing of mixing
+    varies = within > 1e-12
+    r_hat = np.sqrt(np.divide(pooled, within, out=np.ones_like(pooled),
+                              where=varies))
+    effective = np.divide(chains * pooled, between,
+                          out=np.full_like(pooled, chains * kept),
+                          where=varies & (between > 0))
+    return standard_error, r_hat.max(), min(effective.min(), chains * kept)
+
+
+# Inference engines, by name
+ENGINES = {
+    "enumerate": enumerate_probabilities,
+    "bitmask": bitmask_probabilities,
+    "vectorized": vectorized_probabilities,
+    "eliminate": eliminate_probabilities,
+    "likelihood": lambda people, log_space=False: likelihood_weighting(
+        people
+    )[0],
+    "gibbs": lambda people, log_space=False: gibbs_sampling(
+        people, log_space=log_space
+    )[0]
+}
+
+# Sampling engines, which also return convergence diagnostics, by name.
+# Likelihood weighting always keeps its weights in log space.
+SAMPLERS = {
+    "likelihood": lambda people, log_space=False: likelihood_weighting(people),
+    "gibbs": gibbs_sampling
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,158 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from heredity import ENGINES, load_data
+
+# Columns of the CSV output, one row per person
+FIELDS = [
+    "family", "person", "gene_0", "gene_1", "gene_2",
+    "trait_true", "trait_false", "seconds"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run heredity inference on every family CSV in a "
+                    "directory and stream each person's marginals."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--output",
+                        help="file to write to (default: standard output)")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="output format (default: from the output's "
+                             "extension, else csv)")
+    parser.add_argument("--engine", choices=ENGINES, default="eliminate")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--log", action="store_true",
+                        help="accumulate probabilities in log space")
+    args = parser.parse_args()
+
+    output_format = args.format
+    if output_format is None:
+        is_jsonl = args.output is not None and args.output.endswith(".jsonl")
+        output_format = "jsonl" if is_jsonl else "csv"
+
+    paths = sorted(
+        os.path.join(args.directory, filename)
+        for filename in os.listdir(args.directory)
+        if filename.endswith(".csv")
+    )
+
+    f = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        summary = run_batch(paths, f, output_format, args.engine, args.workers,
+                            args.log)
+    finally:
+        if args.output:
+            f.close()
+
+    print(f"{summary['families']} families, {summary['people']} people "
+          f"in {summary['seconds']:.2f} s, {summary['failures']} failed",
+          file=sys.stderr)
+    print(f"  Families per second: {summary['families_per_second']:.1f}",
+          file=sys.stderr)
+    print(f"  People per second: {summary['people_per_second']:.1f}",
+          file=sys.stderr)
+    print(f"  Time per family: {summary['mean_ms']:.3f} ms mean, "
+          f"{summary['max_ms']:.3f} ms max ({summary['slowest']})",
+          file=sys.stderr)
+
+
+def infer_family(path, engine, log_space=False):
+    """
+    Load the family in the CSV file at `path` and return its name, the
+    gene and trait distributions of each person found by `engine`, in log
+    space if `log_space` is True, the seconds inference took, and None.
+
+    If loading or inference fails, return the family's name, None, the
+    seconds spent and a message describing the error instead, so that
+    one bad family does not stop a batch.
+    """
+    family = os.path.splitext(os.path.basename(path))[0]
+    start = time.perf_counter()
+    try:
+        people = load_data(path)
+        start = time.perf_counter()
+        probabilities = ENGINES[engine](people, log_space=log_space)
+    except Exception as error:
+        seconds = time.perf_counter() - start
+        return family, None, seconds, f"{type(error).__name__}: {error}"
+    seconds = time.perf_counter() - start
+    return family, probabilities, seconds, None
+
+
+def rows(family, probabilities, seconds):
+    """
+    Yield a dictionary of output fields for each person in a family.
+    """
+    for person, distributions in probabilities.items():
+        yield {
+            "family": family,
+            "person": person,
+            "gene_0": distributions["gene"][0],
+            "gene_1": distributions["gene"][1],
+            "gene_2": distributions["gene"][2],
+            "trait_true": distributions["trait"][True],
+            "trait_false": distributions["trait"][False],
+            "seconds": seconds
+        }
+
+
+def run_batch(paths, f, output_format="csv", engine="eliminate",
+              workers=None, log_space=False):
+    """
+    Run inference on the family CSV files at `paths` across a process pool
+    of `workers` processes, writing each person's marginals to the file
+    `f` as CSV or JSON lines as soon as their family is done, and return a
+    dictionary summarizing the run. Families that fail are reported on
+    standard error and counted, and the rest of the batch carries on.
+    """
+    writer = None
+    if output_format == "csv":
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+
+    start = time.perf_counter()
+    people = 0
+    times = dict()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            infer_family, paths, [engine] * len(paths),
+            [log_space] * len(paths),
+            chunksize=max(1, len(paths) // 256)
+        )
+        for family, probabilities, seconds, error in results:
+            if error is not None:
+                print(f"{family}: {error}", file=sys.stderr)
+                failures += 1
+                continue
+            for row in rows(family, probabilities, seconds):
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(row) + "\n")
+            people += len(probabilities)
+            times[family] = seconds
+    elapsed = time.perf_counter() - start
+
+    return {
+        "families": len(times),
+        "failures": failures,
+        "people": people,
+        "seconds": elapsed,
+        "families_per_second": len(times) / elapsed,
+        "people_per_second": people / elapsed,
+        "mean_ms": 1000 * sum(times.values()) / len(times) if times else 0,
+        "max_ms": 1000 * max(times.values(), default=0),
+        "slowest": max(times, key=times.get, default=None)
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import itertools
+import math
 import random
 
+from fractions import Fraction
+
+import numpy as np
+
 
 class Minesweeper():
     """
@@ -84,6 +89,69 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation backed by NumPy arrays, with the
+    number of nearby mines precomputed for every cell
+    """
+
+    def __init__(self, height=8, width=8, mines=8):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Sample mine positions without replacement
+        positions = random.sample(range(height * width), mines)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        self.mines = set(divmod(position, width) for position in positions)
+
+        # Count nearby mines for every cell at once, summing the eight
+        # shifted copies of the zero-padded board
+        padded = np.pad(self.board, 1).astype(np.int8)
+        self.counts = np.zeros((height, width), dtype=np.int8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    self.counts += padded[di:di + height, dj:dj + width]
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.board[i, j])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        return int(self.counts[i, j])
+
+    def reveal(self, cell):
+        """
+        Returns the set of cells revealed by choosing the safe cell `cell`:
+        the cell itself and, if it has no nearby mines, every cell reached
+        by flooding through cells that have no nearby mines.
+        """
+        revealed = {cell}
+        frontier = [cell]
+        while frontier:
+            i, j = frontier.pop()
+            if self.counts[i, j] != 0:
+                continue
+            for ni in range(max(i - 1, 0), min(i + 2, self.height)):
+                for nj in range(max(j - 1, 0), min(j + 2, self.width)):
+                    if (ni, nj) not in revealed:
+                        revealed.add((ni, nj))
+                        frontier.append((ni, nj))
+        return revealed
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
@@ -142,8 +210,141 @@ class Sentence():
 
         if cell in self.cells:
             self.cells.remove(cell)
-            
-        
+
+    def key(self):
+        """
+        Returns a hashable key identifying the cells of the sentence.
+        """
+        return frozenset(self.cells)
+
+    def issubset(self, other):
+        """
+        Returns True if every cell of this sentence is in `other`.
+        """
+        return self.cells <= other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of this sentence that are
+        not in `other`, assuming `other` is a subset of this sentence.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
+
+class BitSentence():
+    """
+    Logical statement about a Minesweeper game, storing its cells as
+    bits of an integer indexed by `i * width + j`, so that subset,
+    difference and membership tests are single integer operations.
+    """
+
+    __slots__ = ("bits", "count", "width", "_cells")
+
+    def __init__(self, cells, count, width):
+        self.bits = 0
+        for i, j in cells:
+            self.bits |= 1 << (i * width + j)
+        self.count = count
+        self.width = width
+        self._cells = None
+
+    @classmethod
+    def from_bits(cls, bits, count, width):
+        sentence = cls.__new__(cls)
+        sentence.bits = bits
+        sentence.count = count
+        sentence.width = width
+        sentence._cells = None
+        return sentence
+
+    @property
+    def cells(self):
+        """
+        Returns the set of cells of the sentence, decoded from its bits
+        the first time it is needed after a change.
+        """
+        if self._cells is None:
+            cells = set()
+            bits = self.bits
+            while bits:
+                low = bits & -bits
+                cells.add(divmod(low.bit_length() - 1, self.width))
+                bits ^= low
+            self._cells = cells
+        return self._cells
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __contains__(self, cell):
+        return self.bits >> (cell[0] * self.width + cell[1]) & 1 == 1
+
+    def __eq__(self, other):
+        return self.bits == other.bits and self.count == other.count
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if self.count == len(self):
+            return self.cells
+        else:
+            return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+        else:
+            return set()
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = 1 << (cell[0] * self.width + cell[1])
+        if self.bits & bit:
+            self.bits ^= bit
+            self.count = self.count - 1
+            self._cells = None
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        bit = 1 << (cell[0] * self.width + cell[1])
+        if self.bits & bit:
+            self.bits ^= bit
+            self._cells = None
+
+    def key(self):
+        """
+        Returns a hashable key identifying the cells of the sentence.
+        """
+        return self.bits
+
+    def issubset(self, other):
+        """
+        Returns True if every cell of this sentence is in `other`.
+        """
+        return self.bits & other.bits == self.bits
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of this sentence that are
+        not in `other`, assuming `other` is a subset of this sentence.
+        """
+        return BitSentence.from_bits(self.bits & ~other.bits,
+                                     self.count - other.count, self.width)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
@@ -162,8 +363,14 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, keyed by their cells
+        self.knowledge = dict()
+
+        # Keys of the sentences that mention each cell
+        self.index = dict()
+
+        # Keys of sentences that are new or changed since the last inference
+        self.pending = []
 
     def mark_mine(self, cell):
         """
@@ -171,8 +378,10 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for key in self.index.pop(cell, ()):
+            sentence = self.remove_sentence(key)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
@@ -180,10 +389,44 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        for key in self.index.pop(cell, ()):
+            sentence = self.remove_sentence(key)
             sentence.mark_safe(cell)
-        
-    
+            self.add_sentence(sentence)
+
+    def new_sentence(self, cells, count):
+        """
+        Returns a new sentence saying that `count` of `cells` are mines.
+        """
+        return Sentence(cells, count)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and queues it for inference,
+        unless it is empty or already known.
+        """
+        if not sentence.cells:
+            return
+        key = sentence.key()
+        if key in self.knowledge:
+            return
+        self.knowledge[key] = sentence
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(key)
+        self.pending.append(key)
+
+    def remove_sentence(self, key):
+        """
+        Removes and returns the sentence with the given key.
+        """
+        sentence = self.knowledge.pop(key)
+        for cell in sentence.cells:
+            keys = self.index.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.index[cell]
+        return sentence
 
     def add_knowledge(self, cell, count):
         """
@@ -210,50 +453,59 @@ class MinesweeperAI():
         self.mark_safe(cell)
 
         # add a new sentence to the AI's knowledge base
-        # based on the value of `cell` and `count`
+        # based on the value of `cell` and `count`,
+        # leaving out cells that are already known
 
         neighbor_cells = self.get_neighbors(cell)
+        known_mines = neighbor_cells & self.mines
 
-        new_sentence = Sentence(neighbor_cells, count)
-
-        for mine in self.mines:
-            new_sentence.mark_mine(mine)
+        self.add_sentence(self.new_sentence(
+            neighbor_cells - known_mines - self.safes,
+            count - len(known_mines)
+        ))
 
-        for safe in self.safes:
-            new_sentence.mark_safe(safe)
-
-        self.knowledge.append(new_sentence)
-
-        # mark any additional cells as safe or as mines
-        # if it can be concluded based on the AI's knowledge base
-
-        new_mines = set()
-        new_safes = set()
-
-        for sentence in self.knowledge:
-            for cell in sentence.known_mines():
-                new_mines.add(cell)
-            for cell in sentence.known_safes():
-                new_safes.add(cell)
+        # mark cells and infer new sentences until nothing changes
 
-        for cell in new_mines:
-            self.mark_mine(cell)
-        for cell in new_safes:
-            self.mark_safe(cell)
+        self.infer()
 
-        # add any new sentences to the AI's knowledge base
-        # if they can be inferred from existing knowledge
-
-        add_knowledge = []
+    def infer(self):
+        """
+        Runs inference over the queued sentences until no new cells
+        can be marked and no new sentences can be inferred.
 
-        for sentence in self.knowledge:
-            if new_sentence.cells and sentence.cells != new_sentence.cells:
-                if sentence.cells.issubset(new_sentence.cells):
-                    add_knowledge.append(Sentence(new_sentence.cells - sentence.cells, new_sentence.count - sentence.count))
-                if new_sentence.cells.issubset(sentence.cells):
-                    add_knowledge.append(Sentence(sentence.cells - new_sentence.cells, sentence.count - new_sentence.count))
-        self.knowledge = self.knowledge + add_knowledge
-            
+        Only sentences that share a cell with a queued sentence are
+        compared against it.
+        """
+        while self.pending:
+            key = self.pending.pop()
+            sentence = self.knowledge.get(key)
+            if sentence is None:
+                continue
+
+            # mark cells if the sentence determines them
+            mines = sentence.known_mines()
+            if mines:
+                for cell in list(mines):
+                    self.mark_mine(cell)
+                continue
+            safes = sentence.known_safes()
+            if safes:
+                for cell in list(safes):
+                    self.mark_safe(cell)
+                continue
+
+            # infer new sentences from subsets among overlapping sentences
+            related = set()
+            for cell in sentence.cells:
+                related |= self.index[cell]
+            related.discard(key)
+
+            for other_key in related:
+                other = self.knowledge[other_key]
+                if other.issubset(sentence):
+                    self.add_sentence(sentence.difference(other))
+                elif sentence.issubset(other):
+                    self.add_sentence(other.difference(sentence))
 
     def make_safe_move(self):
         """
@@ -311,6 +563,264 @@ class MinesweeperAI():
                     neighbors.add((i, j))
 
         return neighbors
-    
 
-    
+
+class BitMinesweeperAI(MinesweeperAI):
+    """
+    Minesweeper game player whose knowledge base holds `BitSentence`s
+    """
+
+    def new_sentence(self, cells, count):
+        """
+        Returns a new sentence saying that `count` of `cells` are mines.
+        """
+        return BitSentence(cells, count, self.width)
+
+
+class ProbabilityMinesweeperAI(MinesweeperAI):
+    """
+    Minesweeper game player that, when no move is known to be safe,
+    computes the probability of each cell being a mine and chooses
+    the safest one.
+    """
+
+    def __init__(self, height=8, width=8, mines=8,
+                 max_component=40, max_nodes=5000):
+
+        super().__init__(height, width)
+
+        # Total number of mines on the board, used to weight configurations
+        self.total_mines = mines
+
+        # Components larger than this, or whose search visits more than
+        # `max_nodes` nodes, are estimated instead of enumerated
+        self.max_component = max_component
+        self.max_nodes = max_nodes
+
+        # Enumeration results, keyed by the sentences of a component
+        self.cache = dict()
+
+    def components(self):
+        """
+        Splits the cells mentioned in the knowledge base into independent
+        components, two cells being connected if they share a sentence.
+        Returns a list of (cells, sentences) pairs.
+        """
+        components = []
+        seen = set()
+
+        for start in self.index:
+            if start in seen:
+                continue
+            seen.add(start)
+            cells = []
+            keys = set()
+            frontier = [start]
+            while frontier:
+                cell = frontier.pop()
+                cells.append(cell)
+                for key in self.index[cell]:
+                    if key in keys:
+                        continue
+                    keys.add(key)
+                    for other in self.knowledge[key].cells:
+                        if other not in seen:
+                            seen.add(other)
+                            frontier.append(other)
+            components.append((cells, [self.knowledge[key] for key in keys]))
+
+        return components
+
+    def enumerate_component(self, cells, sentences):
+        """
+        Enumerates the mine configurations of a component that satisfy all
+        of its sentences, by backtracking over groups of its cells.
+
+        Returns a dictionary mapping a number of mines `k` to a pair of the
+        number of configurations with `k` mines and a list of how many of
+        those configurations have a mine in each cell, or None if the
+        search is larger than allowed.
+        """
+        if len(cells) > self.max_component:
+            return None
+
+        # Cells mentioned by exactly the same sentences are interchangeable,
+        # so the search chooses how many mines each such group holds and
+        # counts the ways to place them with a binomial coefficient
+        groups = dict()
+        for cell in cells:
+            group = tuple(n for n, sentence in enumerate(sentences)
+                          if cell in sentence.cells)
+            groups.setdefault(group, []).append(cell)
+        group_sentences = list(groups)
+        sizes = [len(groups[group]) for group in group_sentences]
+        need = [sentence.count for sentence in sentences]
+        free = [len(sentence.cells) for sentence in sentences]
+
+        remaining = self.total_mines - len(self.mines)
+        assignment = [0] * len(sizes)
+        results = dict()
+        nodes = [0]
+
+        def backtrack(i, k, ways):
+            nodes[0] += 1
+            if nodes[0] > self.max_nodes:
+                return False
+            if i == len(sizes):
+                total, per_group = results.setdefault(k, [0, [0] * len(sizes)])
+                results[k][0] = total + ways
+                for j, value in enumerate(assignment):
+                    per_group[j] += ways * value
+                return True
+            size = sizes[i]
+            for value in range(min(size, remaining - k) + 1):
+                if any(need[n] < value or need[n] - value > free[n] - size
+                       for n in group_sentences[i]):
+                    continue
+                for n in group_sentences[i]:
+                    need[n] -= value
+                    free[n] -= size
+                assignment[i] = value
+                finished = backtrack(i + 1, k + value,
+                                     ways * math.comb(size, value))
+                for n in group_sentences[i]:
+                    need[n] += value
+                    free[n] += size
+                if not finished:
+                    return False
+            assignment[i] = 0
+            return True
+
+        if not backtrack(0, 0, 1):
+            return None
+
+        # A group of `size` cells holding `value` mines in `ways` ways has a
+        # mine in each of its cells in `ways * value / size` of them
+        position = {cell: i for i, group in enumerate(group_sentences)
+                    for cell in groups[group]}
+        return {
+            k: (total, [per_group[position[cell]] // sizes[position[cell]]
+                        for cell in cells])
+            for k, (total, per_group) in results.items()
+        }
+
+    def mine_probabilities(self):
+        """
+        Returns a dictionary mapping every cell that has not been chosen
+        and is not known to be a mine to the exact probability, as a
+        Fraction, that it is a mine.
+
+        Each component is enumerated separately, and the components are
+        combined by weighting every total number of frontier mines by the
+        number of ways to place the remaining mines on the other cells.
+        """
+        unknown = (set(itertools.product(range(self.height), range(self.width)))
+                   - self.moves_made - self.mines - self.safes)
+        probabilities = {cell: Fraction(0) for cell in self.safes - self.moves_made}
+        remaining = self.total_mines - len(self.mines)
+
+        exact = []
+        for cells, sentences in self.components():
+            key = frozenset((sentence.key(), sentence.count)
+                            for sentence in sentences)
+            if key not in self.cache:
+                self.cache[key] = self.enumerate_component(cells, sentences)
+            counts = self.cache[key]
+
+            # Components too large to enumerate are estimated from the
+            # densest sentence mentioning each cell, and otherwise treated
+            # like cells outside the frontier
+            if counts is None:
+                for cell in cells:
+                    probabilities[cell] = max(
+                        Fraction(self.knowledge[key].count,
+                                 len(self.knowledge[key].cells))
+                        for key in self.index[cell]
+                    )
+            else:
+                exact.append((cells, counts))
+                unknown -= set(cells)
+
+        outside = len(unknown)
+
+        def combine(skip=None):
+            """
+            Returns the number of configurations of every component other
+            than `skip`, by total number of mines.
+            """
+            totals = {0: 1}
+            for n, (_, counts) in enumerate(exact):
+                if n == skip:
+                    continue
+                combined = dict()
+                for k1, ways1 in totals.items():
+                    for k2, (ways2, _) in counts.items():
+                        combined[k1 + k2] = combined.get(k1 + k2, 0) + ways1 * ways2
+                totals = combined
+            return totals
+
+        def placements(k):
+            """
+            Returns the number of ways to place the mines left over by
+            `k` frontier mines on the cells outside the frontier.
+            """
+            left = remaining - k
+            if left < 0 or left > outside:
+                return 0
+            return math.comb(outside, left)
+
+        totals = combine()
+        weight = sum(ways * placements(k) for k, ways in totals.items())
+
+        # If the mine count is inconsistent with the knowledge base,
+        # weight every frontier configuration equally instead
+        if weight == 0:
+            placements = lambda k: 1
+            weight = sum(totals.values())
+
+        for n, (cells, counts) in enumerate(exact):
+            others = combine(n)
+            mines = [0] * len(cells)
+            for k, (ways, per_cell) in counts.items():
+                factor = sum(other * placements(k + k2)
+                             for k2, other in others.items())
+                for i, count in enumerate(per_cell):
+                    mines[i] += count * factor
+            for cell, count in zip(cells, mines):
+                probabilities[cell] = Fraction(count, weight)
+
+        unknown -= set(probabilities)
+        if unknown:
+            expected = sum(ways * placements(k) * (remaining - k)
+                           for k, ways in totals.items())
+            probability = Fraction(expected, weight * outside)
+            for cell in unknown:
+                probabilities[cell] = min(max(probability, Fraction(0)), Fraction(1))
+
+        return probabilities
+
+    def make_random_move(self):
+        """
+        Returns the move least likely to be a mine, after marking any
+        cells whose probability shows them to be certainly safe or mines.
+        Returns None if every cell has been chosen or is a mine.
+        """
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+
+        for cell, probability in probabilities.items():
+            if probability == 1:
+                self.mark_mine(cell)
+            elif probability == 0 and cell not in self.safes:
+                self.mark_safe(cell)
+        self.infer()
+
+        candidates = [cell for cell in probabilities if cell not in self.mines]
+        if not candidates:
+            return None
+
+        lowest = min(probabilities[cell] for cell in candidates)
+        return random.choice([
+            cell for cell in candidates if probabilities[cell] == lowest
+        ])
@@ -0,0 +1,153 @@
+import argparse
+import random
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import (
+    ArrayMinesweeper, BitMinesweeperAI, Minesweeper, MinesweeperAI,
+    ProbabilityMinesweeperAI
+)
+
+# AI engines that can be benchmarked, by name
+ENGINES = {
+    "basic": lambda height, width, mines: MinesweeperAI(height, width),
+    "bitset": lambda height, width, mines: BitMinesweeperAI(height, width),
+    "probability": ProbabilityMinesweeperAI
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play seeded Minesweeper games headlessly and report "
+                    "how the AI performs."
+    )
+    parser.add_argument("--engine", action="append", choices=ENGINES,
+                        help="AI engine to benchmark (default: all)")
+    parser.add_argument("--board", action="append",
+                        help="board as HEIGHTxWIDTHxMINES "
+                             "(default: 8x8x8, 16x16x40 and 16x30x99)")
+    parser.add_argument("--density", type=float,
+                        help="fraction of cells that are mines, "
+                             "overriding the mines given with --board")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true",
+                        help="track peak memory per game (slower)")
+    parser.add_argument("--array-board", action="store_true",
+                        help="play on the NumPy-backed board")
+    args = parser.parse_args()
+
+    engines = args.engine or list(ENGINES)
+    boards = []
+    for board in args.board or ["8x8x8", "16x16x40", "16x30x99"]:
+        height, width, mines = (int(n) for n in board.split("x"))
+        if args.density is not None:
+            mines = round(height * width * args.density)
+        boards.append((height, width, mines))
+
+    for height, width, mines in boards:
+        for engine in engines:
+            summary = run_benchmark(engine, height, width, mines, args.games,
+                                    args.workers, args.seed, args.memory,
+                                    args.array_board)
+            print(f"{height}x{width}, {mines} mines, {engine}:")
+            print(f"  Win rate: {summary['win_rate']:.2%}")
+            print(f"  Time per move: {summary['ms_per_move']:.3f} ms "
+                  f"(max {summary['max_ms_per_move']:.3f} ms)")
+            print(f"  Knowledge base size: {summary['mean_kb']:.1f} mean, "
+                  f"{summary['max_kb']} max, "
+                  f"{summary['kb_growth']:.2f} sentences per move")
+            if args.memory:
+                print(f"  Peak memory: {summary['peak_kib']:.1f} KiB")
+            print(f"  Games per second: {summary['games_per_second']:.1f}")
+
+
+def play_game(engine, height, width, mines, seed, memory=False,
+              array_board=False):
+    """
+    Play one seeded game of Minesweeper with the AI engine `engine`,
+    choosing safe moves when known and random moves otherwise.
+
+    Return a dictionary with whether the game was won, the number of moves,
+    the total and largest time spent by the AI per move, the knowledge base
+    size after every move, and the peak memory traced if `memory` is True.
+    The game is played on an `ArrayMinesweeper` if `array_board` is True.
+    """
+    random.seed(seed)
+    board = ArrayMinesweeper if array_board else Minesweeper
+    game = board(height=height, width=width, mines=mines)
+    safe_cells = height * width - mines
+
+    if memory:
+        tracemalloc.start()
+    ai = ENGINES[engine](height, width, mines)
+
+    won = False
+    times = []
+    kb_sizes = []
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            times.append(time.perf_counter() - start)
+            break
+        ai.add_knowledge(move, game.nearby_mines(move))
+        times.append(time.perf_counter() - start)
+        kb_sizes.append(len(ai.knowledge))
+        if len(ai.moves_made) == safe_cells:
+            won = True
+            break
+
+    peak = 0
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "won": won,
+        "moves": len(times),
+        "time": sum(times),
+        "max_time": max(times),
+        "kb_sizes": kb_sizes,
+        "peak": peak
+    }
+
+
+def run_benchmark(engine, height, width, mines, games, workers=None, seed=0,
+                  memory=False, array_board=False):
+    """
+    Play `games` games with seeds `seed`, `seed + 1`, ... across a process
+    pool of `workers` processes, and return a dictionary summarizing them.
+    """
+    start = time.perf_counter()
+    seeds = range(seed, seed + games)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            play_game, [engine] * games, [height] * games, [width] * games,
+            [mines] * games, seeds, [memory] * games, [array_board] * games,
+            chunksize=max(1, games // 64)
+        ))
+    elapsed = time.perf_counter() - start
+
+    moves = sum(result["moves"] for result in results)
+    kb_sizes = [size for result in results for size in result["kb_sizes"]]
+    final_sizes = [result["kb_sizes"][-1] for result in results
+                   if result["kb_sizes"]]
+    return {
+        "win_rate": sum(result["won"] for result in results) / games,
+        "ms_per_move": 1000 * sum(result["time"] for result in results) / moves,
+        "max_ms_per_move": 1000 * max(result["max_time"] for result in results),
+        "mean_kb": sum(kb_sizes) / len(kb_sizes) if kb_sizes else 0,
+        "max_kb": max(kb_sizes, default=0),
+        "kb_growth": sum(final_sizes) / moves,
+        "peak_kib": max(result["peak"] for result in results) / 1024,
+        "games_per_second": games / elapsed
+    }
+
+
+if __name__ == "__main__":
+    main()
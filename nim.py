@@ -1,10 +1,17 @@
+import itertools
 import math
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 
 class Nim():
 
+    # Cache of available actions, keyed by the tuple of pile sizes
+    _actions = dict()
+
     def __init__(self, initial=[1, 3, 5, 7]):
         """
         Initialize game board.
@@ -25,11 +32,17 @@ class Nim():
 
         Action `(i, j)` represents the action of removing `j` items
         from pile `i` (where piles are 0-indexed).
+
+        Results are cached per state and returned as a frozenset.
         """
-        actions = set()
-        for i, pile in enumerate(piles):
-            for j in range(1, pile + 1):
-                actions.add((i, j))
+        key = tuple(piles)
+        actions = cls._actions.get(key)
+        if actions is None:
+            actions = frozenset(
+                (i, j) for i, pile in enumerate(piles)
+                for j in range(1, pile + 1)
+            )
+            cls._actions[key] = actions
         return actions
 
     @classmethod
@@ -169,7 +182,7 @@ class NimAI():
 
         if epsilon == True:
             if random.random() <= self.epsilon:
-                return random.sample(available_actions, 1)[0]
+                return random.choice(list(available_actions))
 
         for action in available_actions:
             if self.get_q_value(state, action) > max_q:
@@ -179,17 +192,307 @@ class NimAI():
         return qmax_action
 
 
-def train(n):
+class ArrayNimAI(NimAI):
+
+    def __init__(self, alpha=0.5, epsilon=0.1, initial=[1, 3, 5, 7]):
+        """
+        Initialize AI with a dense Q-table instead of a dictionary.
+
+        States are indexed by a mixed-radix encoding of the pile sizes,
+        with each pile `i` a digit in base `initial[i] + 1`. Actions
+        `(i, j)` are numbered pile by pile, so row `s` of `self.table`
+        holds the Q-values of every action in state `s`.
+
+        The rows are kept as Python lists, since training reads and
+        writes one Q-value at a time and scalar NumPy indexing is slow;
+        `self.table` and `self.visits` convert them to NumPy arrays.
+        """
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.initial = initial.copy()
+
+        self.radix = []
+        size = 1
+        for pile in initial:
+            self.radix.append(size)
+            size *= pile + 1
+
+        self.actions = [
+            (i, j) for i, pile in enumerate(initial)
+            for j in range(1, pile + 1)
+        ]
+        self.action_index = {action: k for k, action in enumerate(self.actions)}
+        self.action_pile = np.array([i for i, _ in self.actions])
+        self.action_count = np.array([j for _, j in self.actions])
+
+        # Row of every state, keyed by the tuple of pile sizes
+        self.state_indices = {
+            state: self.state_index(state)
+            for state in itertools.product(*(range(pile + 1)
+                                             for pile in initial))
+        }
+
+        # Unavailable actions hold -inf, so a plain max over a row only
+        # ever considers the actions available in that state
+        states = np.arange(size)[:, None] // np.array(self.radix)
+        states = states % (np.array(initial) + 1)
+        valid = states[:, self.action_pile] >= self.action_count
+        self.table = np.where(valid, 0.0, -np.inf)
+        self.visits = np.zeros((size, len(self.actions)), dtype=np.int64)
+        self.available = [np.flatnonzero(row).tolist() for row in valid]
+
+    @property
+    def table(self):
+        """
+        The Q-table as a NumPy array with a row per state.
+        """
+        return np.array(self.rows)
+
+    @table.setter
+    def table(self, table):
+        self.rows = np.asarray(table, dtype=float).tolist()
+
+    @property
+    def visits(self):
+        """
+        How many times each Q-value was updated, as a NumPy array
+        shaped like `self.table`.
+        """
+        return np.array(self.visit_rows, dtype=np.int64)
+
+    @visits.setter
+    def visits(self, visits):
+        self.visit_rows = np.asarray(visits, dtype=np.int64).tolist()
+
+    @property
+    def q(self):
+        """
+        Return the Q-values that have been updated, as a dictionary
+        mapping `(state, action)` to a Q-value like `NimAI.q`.
+        """
+        q = dict()
+        for state, s in self.state_indices.items():
+            for k, count in enumerate(self.visit_rows[s]):
+                if count:
+                    q[state, self.actions[k]] = self.rows[s][k]
+        return q
+
+    def state_index(self, state):
+        """
+        Return the row of `self.table` for the state `state`.
+        """
+        index = 0
+        for pile, radix in zip(state, self.radix):
+            index += pile * radix
+        return index
+
+    @classmethod
+    def from_nim_ai(cls, ai, initial=[1, 3, 5, 7]):
+        """
+        Return an `ArrayNimAI` holding the Q-values of the dictionary
+        based `NimAI` `ai`.
+        """
+        player = cls(ai.alpha, ai.epsilon, initial)
+        for (state, action), value in ai.q.items():
+            s = player.state_indices[tuple(state)]
+            k = player.action_index[action]
+            player.rows[s][k] = value
+            player.visit_rows[s][k] = 1
+        return player
+
+    def save(self, filename):
+        """
+        Save the Q-table, visit counts, alpha, epsilon and initial piles
+        to the NumPy archive `filename`, under exactly that name.
+        """
+
+        # Writing through a file keeps np.savez from appending ".npz"
+        with open(filename, "wb") as f:
+            np.savez(f, table=self.table, visits=self.visits,
+                     alpha=self.alpha, epsilon=self.epsilon,
+                     initial=np.array(self.initial))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Return the `ArrayNimAI` saved in the NumPy archive `filename`.
+        """
+        with np.load(filename) as data:
+            player = cls(float(data["alpha"]), float(data["epsilon"]),
+                         [int(pile) for pile in data["initial"]])
+            if data["table"].shape != (len(player.rows), len(player.actions)):
+                raise Exception("Checkpoint does not match its initial piles")
+            player.table = data["table"]
+            player.visits = data["visits"]
+        return player
+
+    def update(self, old_state, action, new_state, reward):
+        """
+        Update the Q-value like `NimAI.update`, looking up each state's
+        row only once.
+        """
+        s = self.state_indices[tuple(old_state)]
+        k = self.action_index[action]
+        row = self.rows[s]
+        best_future = self.best_future_reward(new_state)
+        row[k] += self.alpha * (reward + best_future - row[k])
+        self.visit_rows[s][k] += 1
+
+    def get_q_value(self, state, action):
+        """
+        Return the Q-value for the state `state` and the action `action`.
+        """
+        s = self.state_indices[tuple(state)]
+        return self.rows[s][self.action_index[action]]
+
+    def update_q_value(self, state, action, old_q, reward, future_rewards):
+        """
+        Update the Q-value for the state `state` and the action `action`,
+        using the same formula as `NimAI.update_q_value`.
+        """
+        s = self.state_indices[tuple(state)]
+        k = self.action_index[action]
+        self.rows[s][k] = old_q + self.alpha * (reward + future_rewards - old_q)
+        self.visit_rows[s][k] += 1
+
+    def best_future_reward(self, state):
+        """
+        Given a state `state`, return the maximum Q-value over the
+        available actions, or 0 if it is larger or there are none.
+        """
+        return max(0.0, max(self.rows[self.state_indices[tuple(state)]]))
+
+    def choose_action(self, state, epsilon=True):
+        """
+        Given a state `state`, return an action `(i, j)` to take, taking
+        the first action with the highest Q-value in the state's row.
+
+        If `epsilon` is `True`, then with probability `self.epsilon`
+        choose a random available action instead.
+        """
+        s = self.state_indices[tuple(state)]
+
+        if epsilon == True:
+            if random.random() <= self.epsilon:
+                return self.actions[random.choice(self.available[s])]
+
+        row = self.rows[s]
+        return self.actions[row.index(max(row))]
+
+
+class NimSolver():
+
+    def __init__(self, epsilon=0.1):
+        """
+        Initialize a solver that plays Nim exactly from the nim-sum,
+        with the same interface as `NimAI` but no training.
+
+        The game is misère: `Nim.move` makes the player who takes the
+        last object lose.
+        """
+        self.epsilon = epsilon
+
+    @classmethod
+    def is_winning(cls, state):
+        """
+        Return True if the player to move in `state` can force a win.
+        """
+        if all(pile <= 1 for pile in state):
+            return sum(state) % 2 == 0
+        nim_sum = 0
+        for pile in state:
+            nim_sum ^= pile
+        return nim_sum != 0
+
+    def best_action(self, state):
+        """
+        Return an optimal action `(i, j)` for `state`, or None if there
+        are no objects left. In a losing state, remove a single object
+        from the largest pile.
+        """
+        if not any(state):
+            return None
+
+        big = [i for i, pile in enumerate(state) if pile > 1]
+        ones = sum(1 for pile in state if pile == 1)
+
+        # Only piles of size 1 remain: leave an odd number of them
+        if not big:
+            return (state.index(1), 1)
+
+        # One large pile: reduce it to 0 or 1 to leave an odd number of ones
+        if len(big) == 1:
+            i = big[0]
+            return (i, state[i]) if ones % 2 == 1 else (i, state[i] - 1)
+
+        # Otherwise play normal Nim, moving to a nim-sum of 0
+        nim_sum = 0
+        for pile in state:
+            nim_sum ^= pile
+        if nim_sum != 0:
+            for i, pile in enumerate(state):
+                if pile ^ nim_sum < pile:
+                    return (i, pile - (pile ^ nim_sum))
+
+        i = max(range(len(state)), key=lambda i: state[i])
+        return (i, 1)
+
+    def choose_action(self, state, epsilon=True):
+        """
+        Given a state `state`, return an action `(i, j)` to take.
+
+        If `epsilon` is `True`, then with probability `self.epsilon`
+        choose a random available action, otherwise choose the optimal
+        action.
+        """
+        if epsilon == True:
+            if random.random() <= self.epsilon:
+                return random.choice(list(Nim.available_actions(state)))
+        return self.best_action(list(state))
+
+
+def policy_accuracy(ai, initial=[1, 3, 5, 7]):
+    """
+    Score the greedy policy of `ai` against `NimSolver` over every state
+    reachable from `initial`. Only winning states are scored, since every
+    move in a losing state is equally bad.
+
+    Return the fraction of winning states in which `ai` moves to a state
+    that is losing for the opponent.
+    """
+    correct = 0
+    total = 0
+    for state in itertools.product(*(range(pile + 1) for pile in initial)):
+        state = list(state)
+        if not any(state) or not NimSolver.is_winning(state):
+            continue
+        i, j = ai.choose_action(state, epsilon=False)
+        new_state = state.copy()
+        new_state[i] -= j
+        total += 1
+        if not NimSolver.is_winning(new_state):
+            correct += 1
+    return correct / total if total else 1.0
+
+
+def train(n, player=None, report_every=1000, initial=[1, 3, 5, 7]):
     """
     Train an AI by playing `n` games against itself.
+    `player` defaults to a new `NimAI`.
+
+    Progress is printed every `report_every` games; set it to 0 to
+    train quietly.
     """
 
-    player = NimAI()
+    if player is None:
+        player = NimAI()
+    start = time.perf_counter()
 
     # Play n games
     for i in range(n):
-        print(f"Playing training game {i + 1}")
-        game = Nim()
+        if report_every and (i + 1) % report_every == 0:
+            print(f"Played {i + 1} of {n} training games")
+        game = Nim(initial)
 
         # Keep track of last move made by either player
         last = {
@@ -232,12 +535,69 @@ def train(n):
                     0
                 )
 
-    print("Done training")
+    elapsed = time.perf_counter() - start
+    if report_every:
+        print(f"Done training ({n / elapsed:.0f} games per second)")
 
     # Return the trained AI
     return player
 
 
+def _train_shard(n, alpha, epsilon, initial, seed):
+    """
+    Train an `ArrayNimAI` quietly on `n` games in a worker process and
+    return its Q-table and visit counts.
+    """
+    random.seed(seed)
+    player = train(n, ArrayNimAI(alpha, epsilon, initial), 0, initial)
+    return player.table, player.visits
+
+
+def train_parallel(n, workers=4, merge="visits", alpha=0.5, epsilon=0.1,
+                   initial=[1, 3, 5, 7]):
+    """
+    Train an `ArrayNimAI` on `n` games split into independent shards,
+    one per worker process, and merge the shards' Q-tables.
+
+    `merge` is either "average", which takes the mean of each Q-value
+    across shards, or "visits", which weights each shard's Q-value by
+    how many times that shard updated it.
+    """
+    if merge not in ("average", "visits"):
+        raise ValueError(f"Unknown merge method: {merge}")
+
+    start = time.perf_counter()
+    shards = [n // workers + (1 if k < n % workers else 0)
+              for k in range(workers)]
+    seeds = [random.randrange(2 ** 32) for _ in shards]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            _train_shard, shards, [alpha] * workers, [epsilon] * workers,
+            [initial] * workers, seeds
+        ))
+
+    player = ArrayNimAI(alpha, epsilon, initial)
+    valid = player.table > -np.inf
+    tables = np.stack([table for table, _ in results])
+    visits = np.stack([visits for _, visits in results])
+
+    if merge == "average":
+        merged = np.where(valid, tables, 0).mean(axis=0)
+    else:
+        weighted = (np.where(valid, tables, 0) * visits).sum(axis=0)
+        merged = weighted / np.maximum(visits.sum(axis=0), 1)
+
+    player.table = np.where(valid, merged, -np.inf)
+    player.visits = visits.sum(axis=0)
+
+    elapsed = time.perf_counter() - start
+    print(f"Done training on {workers} workers "
+          f"({n / elapsed:.0f} games per second)")
+
+    return player
+
+
 def play(ai, human_player=None):
     """
     Play human game against the AI.
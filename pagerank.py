@@ -1,10 +1,22 @@
+import json
+import multiprocessing
 import os
 import random
 import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
 
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 1e-6
+
+# Pattern of a link in an HTML page, and bytes read at a time when streaming
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+CHUNK_SIZE = 1 << 16
 
 
 def main():
@@ -19,6 +31,10 @@ def main():
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    ranks, iterations = sparse_pagerank(corpus, DAMPING)
+    print(f"PageRank Results from Power Iteration ({iterations} iterations)")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
 
 
 def crawl(directory):
@@ -48,6 +64,90 @@ def crawl(directory):
     return pages
 
 
+def parse_links(path):
+    """
+    Return the set of links in the HTML file at `path`, reading it in
+    chunks rather than all at once.
+    """
+    links = set()
+    tail = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer = tail + chunk
+            end = 0
+            for match in LINK.finditer(buffer):
+                links.add(match.group(1))
+                end = match.end()
+
+            # Keep any tag that may continue into the next chunk
+            start = buffer.rfind("<", end)
+            tail = buffer[start:] if start != -1 else ""
+    return links
+
+
+def crawl_graph(directory, workers=None, cache=None):
+    """
+    Parse a directory of HTML pages in a process pool and return the
+    `Graph` of links between pages in the corpus.
+
+    If `cache` is the path of a JSON file, the links found in each file
+    are saved there with the file's modification time, and only files
+    that are new or have changed since are parsed again.
+    """
+    filenames = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    mtimes = {
+        filename: os.path.getmtime(os.path.join(directory, filename))
+        for filename in filenames
+    }
+
+    cached = dict()
+    if cache is not None and os.path.exists(cache):
+        with open(cache) as f:
+            cached = json.load(f)
+
+    stale = [filename for filename in filenames
+             if filename not in cached
+             or cached[filename]["mtime"] != mtimes[filename]]
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = executor.map(
+                parse_links,
+                [os.path.join(directory, filename) for filename in stale],
+                chunksize=max(1, len(stale) // 256)
+            )
+            for filename, links in zip(stale, parsed):
+                cached[filename] = {
+                    "mtime": mtimes[filename], "links": sorted(links)
+                }
+
+    # Drop files that no longer exist, and save the cache if it changed
+    removed = len(cached) != len(filenames)
+    cached = {filename: cached[filename] for filename in filenames}
+    if cache is not None and (stale or removed):
+        with open(cache, "w") as f:
+            json.dump(cached, f)
+
+    # Only include links to other pages in the corpus
+    index = {filename: i for i, filename in enumerate(filenames)}
+    sources = []
+    targets = []
+    for filename in filenames:
+        i = index[filename]
+        for link in cached[filename]["links"]:
+            j = index.get(link)
+            if j is not None and j != i:
+                sources.append(i)
+                targets.append(j)
+
+    return Graph(filenames, sources, targets)
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -101,6 +201,47 @@ def sample_pagerank(corpus, damping_factor, n):
     return s_pagerank
 
 
+def vectorized_sample_pagerank(corpus, damping_factor, n, surfers=10000,
+                               seed=None, burn_in=50):
+    """
+    Return PageRank values for each page by sampling `n` pages with many
+    independent random surfers moving at once, each starting at a page
+    chosen at random and taking `burn_in` steps before its pages are
+    counted, so that short walks are not biased towards the start.
+
+    Each surfer follows a random link from its page with probability
+    `damping_factor`, and otherwise, or if its page has no links, jumps
+    to a random page. `seed` makes the sampling reproducible.
+
+    `corpus` is as returned by `crawl`, or a `Graph`. Return a dictionary
+    like `sample_pagerank`.
+    """
+    graph = corpus if isinstance(corpus, Graph) else Graph.from_corpus(corpus)
+    indptr, indices = graph.outgoing()
+    rng = np.random.default_rng(seed)
+    pages = len(graph)
+
+    surfers = max(1, min(surfers, n))
+    current = rng.integers(pages, size=surfers)
+    counts = np.zeros(pages, dtype=np.int64)
+    remaining = n + burn_in * surfers
+
+    while remaining > 0:
+        if remaining < len(current):
+            current = current[:remaining]
+        degree = graph.out_degree[current]
+        follow = (rng.random(len(current)) < damping_factor) & (degree > 0)
+        choice = (rng.random(follow.sum()) * degree[follow]).astype(np.int64)
+        following = current[follow]
+        current = rng.integers(pages, size=len(current))
+        current[follow] = indices[indptr[following] + choice]
+        if remaining <= n:
+            counts += np.bincount(current, minlength=pages)
+        remaining -= len(current)
+
+    return graph.ranks(counts / n)
+
+
 def iterate_pagerank(corpus, damping_factor):
     """
     Return PageRank values for each page by iteratively updating
@@ -132,6 +273,582 @@ def iterate_pagerank(corpus, damping_factor):
 
     return i_pagerank
 
-    
+
+def row_sums(indptr, indices, values):
+    """
+    Return, for every row `i` of the sparse matrix given by `indptr` and
+    `indices`, the sum of `values[indices[indptr[i]:indptr[i + 1]]]`.
+    """
+    zero = np.zeros((1,) + values.shape[1:])
+    gathered = np.concatenate((values[indices], zero))
+    starts = np.minimum(indptr[:-1], len(indices))
+    sums = np.add.reduceat(gathered, starts)
+    sums[indptr[:-1] == indptr[1:]] = 0
+    return sums
+
+
+class Graph():
+    """
+    Link graph of a corpus in compressed sparse row form: the pages
+    linking to page `i` are `indices[indptr[i]:indptr[i + 1]]`.
+    """
+
+    def __init__(self, pages, sources, targets):
+        """
+        Build the graph from a list of page names and two parallel arrays
+        of page numbers, one edge `sources[k] -> targets[k]` per link.
+        """
+        self.pages = list(pages)
+        n = len(self.pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        order = np.argsort(targets, kind="stable")
+        self.indices = sources[order].astype(np.int32)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=self.indptr[1:])
+        self.out_degree = np.bincount(sources, minlength=n)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the graph of a corpus as returned by `crawl`.
+        """
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page, links in corpus.items():
+            i = index[page]
+            for link in links:
+                sources.append(i)
+                targets.append(index[link])
+        return cls(pages, sources, targets)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def incoming(self, values):
+        """
+        Return, for every page, the sum of `values` over the pages
+        linking to it. `values` may have one column per ranking.
+        """
+        return row_sums(self.indptr, self.indices, values)
+
+    def step(self, ranks, damping_factor, teleport=None):
+        """
+        Return the ranks after one step of the random surfer, who jumps
+        to a page drawn from `teleport` (uniform by default) instead of
+        following a link with probability `1 - damping_factor`. Pages with
+        no links are treated as linking to every page, so their rank is
+        spread over the corpus like a jump.
+
+        `ranks` and `teleport` may be N x K matrices, one column per ranking.
+        """
+        n = len(self)
+        linked = self.out_degree > 0
+        degree = self.out_degree.reshape((-1,) + (1,) * (ranks.ndim - 1))
+        shares = np.divide(ranks, degree, out=np.zeros(ranks.shape),
+                           where=degree > 0)
+        dangling = ranks[~linked].sum(axis=0)
+        if teleport is None:
+            teleport = 1 / n
+        return ((1 - damping_factor) * teleport
+                + damping_factor * (self.incoming(shares) + dangling * teleport))
+
+    def outgoing(self):
+        """
+        Return the graph's links grouped by source page, as `indptr` and
+        `indices` arrays: page `i` links to `indices[indptr[i]:indptr[i + 1]]`.
+        """
+        if not hasattr(self, "_outgoing"):
+            targets = np.repeat(np.arange(len(self)),
+                                np.diff(self.indptr)).astype(np.int32)
+            order = np.argsort(self.indices, kind="stable")
+            indptr = np.zeros(len(self) + 1, dtype=np.int64)
+            np.cumsum(self.out_degree, out=indptr[1:])
+            self._outgoing = (indptr, targets[order])
+        return self._outgoing
+
+    def corpus(self):
+        """
+        Return the graph as a dictionary mapping each page name to the
+        set of pages it links to, like `crawl`.
+        """
+        indptr, indices = self.outgoing()
+        return {
+            page: set(self.pages[j] for j in indices[indptr[i]:indptr[i + 1]])
+            for i, page in enumerate(self.pages)
+        }
+
+    def ranks(self, values):
+        """
+        Return a dictionary mapping each page name to its value.
+        """
+        return dict(zip(self.pages, values.tolist()))
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=1000, ranks=None, teleport=None):
+    """
+    Return the PageRank array of `graph` and the number of iterations run,
+    starting from `ranks` (the teleport distribution by default) and
+    stopping once the L1 change between iterations is below `tolerance`.
+
+    `teleport` may be an N x K matrix of K teleport distributions, in
+    which case all K rankings are computed together and the change of the
+    slowest one decides when to stop.
+    """
+    n = len(graph)
+    if ranks is None:
+        ranks = np.full(n, 1 / n) if teleport is None else teleport.copy()
+
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = graph.step(ranks, damping_factor, teleport)
+        change = np.abs(new_ranks - ranks).sum(axis=0).max()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+
+    return ranks, iteration
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration over the
+    sparse link graph, until the L1 change is below `tolerance`.
+
+    `corpus` is as returned by `crawl`, or a `Graph`. Return a dictionary
+    of PageRank values, like `iterate_pagerank`, and the number of
+    iterations run.
+    """
+    graph = corpus if isinstance(corpus, Graph) else Graph.from_corpus(corpus)
+    ranks, iterations = power_iteration(graph, damping_factor, tolerance)
+    return graph.ranks(ranks), iterations
+
+
+def _shared_array(blocks, array):
+    """
+    Copy `array` into a new shared memory block, appended to `blocks`,
+    and return the block's name.
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    blocks.append(block)
+    return block.name
+
+
+def _attach(names, blocks, shape, dtype):
+    """
+    Return an array backed by the shared memory block `names`, keeping
+    a reference to the block in `blocks`.
+    """
+    block = shared_memory.SharedMemory(name=names)
+    blocks.append(block)
+    return np.ndarray(shape, dtype, buffer=block.buf)
+
+
+def _parallel_worker(worker, rows, names, n, edges, workers, damping_factor,
+                     tolerance, max_iterations, barrier):
+    """
+    Run power iteration for the pages `rows[0]` to `rows[1]` in a worker
+    process, synchronizing with the other workers once per iteration.
+
+    Ranks, shares and per-worker partial sums are double-buffered by the
+    parity of the iteration, so no worker overwrites values another is
+    still reading.
+    """
+    blocks = []
+    try:
+        indptr = _attach(names["indptr"], blocks, (n + 1,), np.int64)
+        indices = _attach(names["indices"], blocks, (edges,), np.int32)
+        degree = _attach(names["degree"], blocks, (n,), np.int64)
+        ranks = _attach(names["ranks"], blocks, (2, n), np.float64)
+        shares = _attach(names["shares"], blocks, (2, n), np.float64)
+        partials = _attach(names["partials"], blocks, (2, workers, 2), np.float64)
+        result = _attach(names["result"], blocks, (1,), np.int64)
+
+        low, high = rows
+        local_indptr = indptr[low:high + 1] - indptr[low]
+        local_indices = indices[indptr[low]:indptr[high]]
+        local_degree = degree[low:high]
+        linked = local_degree > 0
+
+        for iteration in range(1, max_iterations + 1):
+            current = (iteration - 1) % 2
+            following = iteration % 2
+
+            dangling = partials[current, :, 0].sum()
+            new_ranks = (1 - damping_factor) / n + damping_factor * (
+                row_sums(local_indptr, local_indices, shares[current])
+                + dangling / n
+            )
+            ranks[following, low:high] = new_ranks
+            shares[following, low:high] = np.divide(
+                new_ranks, local_degree, out=np.zeros(high - low), where=linked
+            )
+            partials[following, worker, 0] = new_ranks[~linked].sum()
+            partials[following, worker, 1] = np.abs(
+                new_ranks - ranks[current, low:high]).sum()
+
+            barrier.wait()
+
+            if partials[following, :, 1].sum() < tolerance:
+                break
+
+        if worker == 0:
+            result[0] = iteration
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def parallel_pagerank(corpus, damping_factor, workers=4, tolerance=TOLERANCE,
+                      max_iterations=1000):
+    """
+    Return PageRank values for each page by power iteration split across
+    `workers` processes, each computing the ranks of a range of pages
+    with about the same number of incoming links. Rank vectors live in
+    shared memory and workers synchronize once per iteration.
+
+    `corpus` is as returned by `crawl`, or a `Graph`. Return a dictionary
+    of PageRank values and the number of iterations run. With one worker,
+    this is `power_iteration`, without the cost of a process.
+    """
+    graph = corpus if isinstance(corpus, Graph) else Graph.from_corpus(corpus)
+    n = len(graph)
+    edges = len(graph.indices)
+    workers = max(1, min(workers, n))
+    if workers == 1:
+        values, iterations = power_iteration(graph, damping_factor, tolerance,
+                                             max_iterations)
+        return graph.ranks(values), iterations
+
+    ranks = np.full((2, n), 1 / n)
+    shares = np.zeros((2, n))
+    np.divide(ranks[0], graph.out_degree, out=shares[0],
+              where=graph.out_degree > 0)
+    partials = np.zeros((2, workers, 2))
+    partials[0, 0, 0] = ranks[0][graph.out_degree == 0].sum()
+
+    # Split the pages into ranges with about the same number of links
+    bounds = np.searchsorted(graph.indptr,
+                             np.linspace(0, edges, workers + 1)[1:-1])
+    bounds = [0] + np.clip(bounds, 0, n).tolist() + [n]
+
+    blocks = []
+    try:
+        names = {
+            "indptr": _shared_array(blocks, graph.indptr),
+            "indices": _shared_array(blocks, graph.indices),
+            "degree": _shared_array(blocks, graph.out_degree.astype(np.int64)),
+            "ranks": _shared_array(blocks, ranks),
+            "shares": _shared_array(blocks, shares),
+            "partials": _shared_array(blocks, partials),
+            "result": _shared_array(blocks, np.zeros(1, dtype=np.int64))
+        }
+        barrier = multiprocessing.Barrier(workers)
+        processes = [
+            multiprocessing.Process(target=_parallel_worker, args=(
+                worker, (bounds[worker], bounds[worker + 1]), names, n,
+                edges, workers, damping_factor, tolerance, max_iterations,
+                barrier
+            ))
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode != 0 for process in processes):
+            raise Exception("Parallel PageRank worker failed")
+
+        iterations = int(np.ndarray((1,), np.int64, buffer=blocks[-1].buf)[0])
+        ranks = np.ndarray((2, n), np.float64, buffer=blocks[3].buf)
+        values = ranks[iterations % 2].copy()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return graph.ranks(values), iterations
+
+
+def power_law_graph(n, mean_degree=8, exponent=2.1, dangling=0.1, seed=None):
+    """
+    Return a random `Graph` of `n` pages whose numbers of outgoing and
+    incoming links both follow power laws with the given exponent, with
+    a `dangling` fraction of pages that have no links.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Pareto out-degrees scaled to the mean degree
+    degrees = rng.pareto(exponent - 1, n) + 1
+    degrees = np.minimum(degrees * mean_degree / degrees.mean(), n - 1)
+    degrees = np.round(degrees).astype(np.int64)
+    degrees[rng.random(n) < dangling] = 0
+
+    # Zipf-like popularity for choosing link targets
+    popularity = np.arange(1, n + 1) ** (-1 / (exponent - 1))
+    popularity = rng.permutation(popularity / popularity.sum())
+
+    sources = np.repeat(np.arange(n), degrees)
+    targets = rng.choice(n, size=len(sources), p=popularity)
+    keys = np.unique(sources[sources != targets] * n + targets[sources != targets])
+    return Graph([f"{i}.html" for i in range(n)], keys // n, keys % n)
+
+
+def benchmark_parallel_pagerank(n=10 ** 6, worker_counts=(1, 2, 4, 8),
+                                seed=0):
+    """
+    Time `parallel_pagerank` on a synthetic power-law graph of `n` pages
+    for each number of workers, and return a dictionary mapping the
+    worker count to seconds taken, with 0 for serial `power_iteration`.
+
+    Worker counts above `os.cpu_count()` share cores, so they measure the
+    cost of synchronization rather than any speedup.
+    """
+    graph = power_law_graph(n, seed=seed)
+    start = time.perf_counter()
+    expected, _ = power_iteration(graph, DAMPING)
+    timings = {0: time.perf_counter() - start}
+
+    for workers in worker_counts:
+        start = time.perf_counter()
+        ranks, _ = parallel_pagerank(graph, DAMPING, workers)
+        timings[workers] = time.perf_counter() - start
+        values = np.array([ranks[page] for page in graph.pages])
+        if np.abs(values - expected).sum() > 10 * TOLERANCE:
+            raise Exception("Parallel PageRank disagrees with power iteration")
+
+    return timings
+
+
+def personalized_pagerank(corpus, seeds, damping_factor, tolerance=TOLERANCE):
+    """
+    Return personalized PageRank values for many seed sets at once.
+
+    `corpus` is as returned by `crawl`, or a `Graph`. Each seed is a set
+    of pages to jump to uniformly, or a dictionary mapping pages to
+    jump weights. All seeds are solved together as one N x K power
+    iteration over the same link graph.
+
+    Return a list with a dictionary of PageRank values per seed.
+    """
+    graph = corpus if isinstance(corpus, Graph) else Graph.from_corpus(corpus)
+    index = {page: i for i, page in enumerate(graph.pages)}
+
+    teleport = np.zeros((len(graph), len(seeds)))
+    for k, seed in enumerate(seeds):
+        weights = seed if isinstance(seed, dict) else dict.fromkeys(seed, 1)
+        for page, weight in weights.items():
+            teleport[index[page], k] = weight
+    teleport /= teleport.sum(axis=0)
+
+    ranks, _ = power_iteration(graph, damping_factor, tolerance,
+                               teleport=teleport)
+    return [graph.ranks(ranks[:, k]) for k in range(len(seeds))]
+
+
+def write_edge_file(corpus, path):
+    """
+    Write the links of `corpus`, as returned by `crawl` or `crawl_graph`,
+    to the binary file `path` as pairs of int32 page numbers
+    (source, target) sorted by target, and the page names, one per line,
+    to `path + ".pages"`.
+    """
+    graph = corpus if isinstance(corpus, Graph) else Graph.from_corpus(corpus)
+    targets = np.repeat(np.arange(len(graph)), np.diff(graph.indptr))
+    edges = np.column_stack((graph.indices, targets)).astype(np.int32)
+    edges.tofile(path)
+    with open(path + ".pages", "w") as f:
+        for page in graph.pages:
+            f.write(page + "\n")
+
+
+def out_of_core_pagerank(path, damping_factor, tolerance=TOLERANCE,
+                         max_iterations=1000, block_size=1 << 22):
+    """
+    Return PageRank values for each page of the edge file `path`, written
+    by `write_edge_file`, and the number of iterations run.
+
+    The edges are memory-mapped and every iteration streams over them in
+    blocks of `block_size` edges, so only the rank vectors and out-degrees
+    are held in memory. Pages with no links are treated as in `Graph.step`.
+    """
+    with open(path + ".pages") as f:
+        pages = f.read().splitlines()
+    n = len(pages)
+    if os.path.getsize(path) == 0:
+        edges = np.zeros((0, 2), dtype=np.int32)
+    else:
+        edges = np.memmap(path, dtype=np.int32, mode="r").reshape(-1, 2)
+
+    def blocks():
+        for start in range(0, len(edges), block_size):
+            block = np.asarray(edges[start:start + block_size])
+            yield block[:, 0], block[:, 1]
+
+    out_degree = np.zeros(n, dtype=np.int64)
+    for sources, _ in blocks():
+        out_degree += np.bincount(sources, minlength=n)
+    linked = out_degree > 0
+
+    ranks = np.full(n, 1 / n)
+    for iteration in range(1, max_iterations + 1):
+        shares = np.divide(ranks, out_degree, out=np.zeros(n), where=linked)
+        incoming = np.zeros(n)
+        for sources, targets in blocks():
+
+            # Edges are sorted by target, so each block covers a narrow range
+            low = targets.min()
+            high = targets.max()
+            incoming[low:high + 1] += np.bincount(
+                targets - low, weights=shares[sources], minlength=high - low + 1
+            )
+        dangling = ranks[~linked].sum()
+        new_ranks = (1 - damping_factor) / n + damping_factor * (incoming + dangling / n)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+
+    return dict(zip(pages, ranks.tolist())), iteration
+
+
+class IncrementalPageRank():
+    """
+    PageRank of a corpus that changes a few pages or links at a time.
+
+    The link graph is kept as arrays of page numbers, so changes are
+    applied to it with array operations instead of rebuilding it from a
+    dictionary, and `update` restarts power iteration from the previous
+    ranks rather than from uniform ranks, so small changes converge in
+    few iterations.
+    """
+
+    def __init__(self, corpus, damping_factor=DAMPING, tolerance=TOLERANCE):
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.iterations = 0
+        self.values = None
+        self.sync(corpus)
+        self.update()
+
+    def sync(self, corpus):
+        """
+        Replace the stored graph with that of `corpus`, such as a new
+        `crawl` of the same directory, keeping the ranks of pages that
+        are still in it to start from.
+        """
+        previous = self.ranks() if self.values is not None else dict()
+        graph = Graph.from_corpus(corpus)
+        self.pages = graph.pages
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.sources = graph.indices.astype(np.int64)
+        self.targets = np.repeat(np.arange(len(graph)), np.diff(graph.indptr))
+        self.values = np.array([previous.get(page, 0.0) for page in self.pages])
+        self.added = set()
+        self.removed_links = set()
+        self.removed_pages = set()
+
+    def add_page(self, page, links=()):
+        """
+        Add `page` linking to `links`, or add `links` to it if it exists.
+        """
+        if page not in self.index:
+            self.index[page] = len(self.pages)
+            self.pages.append(page)
+        for link in links:
+            self.add_link(page, link)
+
+    def remove_page(self, page):
+        """
+        Remove `page` and every link to or from it.
+        """
+        self.removed_pages.add(self.index.pop(page))
+
+    def add_link(self, source, target):
+        """
+        Add a link from `source` to `target`, cancelling any pending
+        removal of it. Links to pages that are not in the corpus when
+        `update` is called are ignored, as in `crawl`.
+        """
+        if source == target:
+            return
+        if source in self.index and target in self.index:
+            self.removed_links.discard((self.index[source], self.index[target]))
+        self.added.add((source, target))
+
+    def remove_link(self, source, target):
+        """
+        Remove the link from `source` to `target`, if there is one,
+        cancelling any pending addition of it.
+        """
+        self.added.discard((source, target))
+        if source in self.index and target in self.index:
+            self.removed_links.add((self.index[source], self.index[target]))
+
+    def update(self):
+        """
+        Apply the pending changes, recompute the ranks starting from the
+        previous ones, and return a dictionary of PageRank values like
+        `iterate_pagerank`.
+
+        New pages start at the uniform rank, and the starting ranks are
+        rescaled to sum to 1.
+        """
+        n = len(self.pages)
+
+        # Add new links between pages that exist
+        added = [(self.index[source], self.index[target])
+                 for source, target in self.added
+                 if source in self.index and target in self.index]
+        sources = np.concatenate(
+            [self.sources, np.array([i for i, _ in added], dtype=np.int64)])
+        targets = np.concatenate(
+            [self.targets, np.array([j for _, j in added], dtype=np.int64)])
+
+        # Drop removed and duplicate links, and links of removed pages
+        keys = sources * n + targets
+        keep = ~np.isin(keys, [i * n + j for i, j in self.removed_links])
+        removed = np.zeros(n, dtype=bool)
+        removed[list(self.removed_pages)] = True
+        keep &= ~removed[sources] & ~removed[targets]
+        _, first = np.unique(keys[keep], return_index=True)
+        sources = sources[keep][first]
+        targets = targets[keep][first]
+
+        # Renumber the remaining pages
+        number = np.cumsum(~removed) - 1
+        self.pages = [page for i, page in enumerate(self.pages) if not removed[i]]
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.sources = number[sources]
+        self.targets = number[targets]
+        self.added = set()
+        self.removed_links = set()
+        self.removed_pages = set()
+
+        graph = Graph(self.pages, self.sources, self.targets)
+        start = np.full(len(self.pages), 1 / len(self.pages))
+        kept = self.values[~removed[:len(self.values)]]
+        start[:len(kept)] = np.where(kept > 0, kept, start[:len(kept)])
+        start /= start.sum()
+
+        self.values, self.iterations = power_iteration(
+            graph, self.damping_factor, self.tolerance, ranks=start
+        )
+        return self.ranks()
+
+    def ranks(self):
+        """
+        Return a dictionary of the current PageRank values.
+        """
+        return dict(zip(self.pages, self.values.tolist()))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,202 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from pagerank import (
+    DAMPING, Graph, iterate_pagerank, out_of_core_pagerank, parallel_pagerank,
+    power_iteration, power_law_graph, sample_pagerank, sparse_pagerank,
+    vectorized_sample_pagerank, write_edge_file
+)
+
+# Benchmarked engines, each called with the corpus as a dictionary (None
+# unless the engine is in NEEDS_CORPUS), its graph, the path of its edge
+# file and the parsed arguments, and the largest number of pages each is
+# run on
+ENGINES = {
+    "sample": (
+        lambda corpus, graph, path, args:
+            sample_pagerank(corpus, DAMPING, args.samples),
+        10 ** 3
+    ),
+    "iterate": (
+        lambda corpus, graph, path, args: iterate_pagerank(corpus, DAMPING),
+        10 ** 3
+    ),
+    "vectorized_sample": (
+        lambda corpus, graph, path, args: vectorized_sample_pagerank(
+            graph, DAMPING, args.samples, seed=args.seed),
+        10 ** 6
+    ),
+    "sparse": (
+        lambda corpus, graph, path, args: sparse_pagerank(graph, DAMPING)[0],
+        10 ** 6
+    ),
+    "parallel": (
+        lambda corpus, graph, path, args:
+            parallel_pagerank(graph, DAMPING, args.workers)[0],
+        10 ** 7
+    ),
+    "out_of_core": (
+        lambda corpus, graph, path, args:
+            out_of_core_pagerank(path, DAMPING)[0],
+        10 ** 7
+    )
+}
+
+# Engines that read the corpus as a dictionary rather than its graph
+NEEDS_CORPUS = {"sample", "iterate"}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic web graphs and benchmark PageRank "
+                    "engines on them."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser(
+        "generate", help="write a synthetic corpus or edge file")
+    generate.add_argument("pages", type=int)
+    generate.add_argument("output",
+                          help="directory for an HTML corpus, or path of "
+                               "an edge file with --edges")
+    generate.add_argument("--edges", action="store_true",
+                          help="write a binary edge file instead of HTML")
+
+    run = commands.add_parser("run", help="benchmark engines")
+    run.add_argument("--sizes", type=int, nargs="+",
+                     default=[10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5])
+    run.add_argument("--engine", action="append", choices=ENGINES,
+                     help="engine to benchmark (default: all)")
+    run.add_argument("--samples", type=int, default=10 ** 5)
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--memory", action="store_true",
+                     help="also measure peak memory, in a second run")
+
+    for command in (generate, run):
+        command.add_argument("--seed", type=int, default=0)
+        command.add_argument("--mean-degree", type=float, default=8)
+        command.add_argument("--exponent", type=float, default=2.1)
+        command.add_argument("--dangling", type=float, default=0.1)
+        command.add_argument("--cycles", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        graph = generate_graph(args.pages, args)
+        if args.edges:
+            write_edge_file(graph, args.output)
+        else:
+            write_html_corpus(graph, args.output)
+        print(f"Wrote {len(graph)} pages and {len(graph.indices)} links "
+              f"to {args.output}")
+        return
+
+    for n in args.sizes:
+        print(f"{n} pages:")
+        for engine, result in run_benchmark(n, args).items():
+            if result is None:
+                print(f"  {engine}: skipped")
+                continue
+            seconds, peak, error = result
+            memory = f"{peak / 2 ** 20:.1f} MiB peak, " if args.memory else ""
+            print(f"  {engine}: {seconds:.3f} s, {memory}L1 error {error:.2e}")
+
+
+def generate_graph(n, args):
+    """
+    Return a power-law `Graph` of `n` pages with the options in `args`,
+    with `args.cycles` extra directed cycles through random pages.
+    """
+    graph = power_law_graph(n, args.mean_degree, args.exponent,
+                            args.dangling, args.seed)
+    if args.cycles == 0 or n < 2:
+        return graph
+
+    rng = np.random.default_rng(args.seed + 1)
+    sources = [graph.indices.astype(np.int64)]
+    targets = [np.repeat(np.arange(n), np.diff(graph.indptr))]
+    for _ in range(args.cycles):
+        cycle = rng.choice(n, size=min(n, rng.integers(2, 11)), replace=False)
+        sources.append(cycle)
+        targets.append(np.roll(cycle, -1))
+    keys = np.unique(np.concatenate(sources) * n + np.concatenate(targets))
+    return Graph(graph.pages, keys // n, keys % n)
+
+
+def write_html_corpus(graph, directory):
+    """
+    Write each page of `graph` as an HTML file in `directory`, linking
+    to the pages it links to in the graph.
+    """
+    os.makedirs(directory, exist_ok=True)
+    indptr, indices = graph.outgoing()
+    for i, page in enumerate(graph.pages):
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<head>\n<title>{page}</title>\n"
+                    "</head>\n<body>\n")
+            for j in indices[indptr[i]:indptr[i + 1]]:
+                f.write(f"<a href=\"{graph.pages[j]}\">{graph.pages[j]}</a>\n")
+            f.write("</body>\n</html>\n")
+
+
+def measure(function, *args, memory=False):
+    """
+    Call `function` and return its result and the seconds it took. If
+    `memory` is True, call it again while tracing allocations and also
+    return its peak memory in bytes, otherwise return 0 for it.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+
+    peak = 0
+    if memory:
+        tracemalloc.start()
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, seconds, peak
+
+
+def run_benchmark(n, args):
+    """
+    Run every selected engine on a synthetic graph of `n` pages and return
+    a dictionary mapping each engine to its seconds taken, peak memory
+    (0 unless `args.memory` is set) and L1 error against a tightly
+    converged power iteration, or to None if the graph is too large for it.
+    """
+    graph = generate_graph(n, args)
+    reference, _ = power_iteration(graph, DAMPING, tolerance=1e-12)
+
+    # Only build the dictionary corpus if an engine that reads it will run
+    engines = args.engine or list(ENGINES)
+    corpus = None
+    if any(engine in NEEDS_CORPUS and n <= ENGINES[engine][1]
+           for engine in engines):
+        corpus = graph.corpus()
+
+    results = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "edges.bin")
+        write_edge_file(graph, path)
+
+        for engine in engines:
+            function, limit = ENGINES[engine]
+            if n > limit:
+                results[engine] = None
+                continue
+            ranks, seconds, peak = measure(function, corpus, graph, path,
+                                           args, memory=args.memory)
+            values = np.array([ranks.get(page, 0) for page in graph.pages])
+            results[engine] = (seconds, peak, np.abs(values - reference).sum())
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,27 @@
-from nim import train, play
+import os
+import sys
+
+from nim import ArrayNimAI, train, play
+
+# Usage: python play.py [checkpoint [games]]
+#   checkpoint: load the AI from this file, training and saving it first
+#               if it does not exist yet
+#   games:      resume training the checkpoint for this many more games
+if len(sys.argv) > 3:
+    sys.exit("Usage: python play.py [checkpoint [games]]")
+
+if len(sys.argv) == 1:
+    ai = train(10000)
+else:
+    checkpoint = sys.argv[1]
+    if os.path.exists(checkpoint):
+        ai = ArrayNimAI.load(checkpoint)
+        if len(sys.argv) == 3:
+            ai = train(int(sys.argv[2]), ai)
+            ai.save(checkpoint)
+    else:
+        ai = train(int(sys.argv[2]) if len(sys.argv) == 3 else 10000,
+                   ArrayNimAI())
+        ai.save(checkpoint)
 
-ai = train(10000)
 play(ai)
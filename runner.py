@@ -2,11 +2,21 @@ import pygame
 import sys
 import time
 
-from minesweeper import Minesweeper, MinesweeperAI
-
-HEIGHT = 8
-WIDTH = 8
-MINES = 8
+from minesweeper import ArrayMinesweeper, MinesweeperAI
+
+# Usage: python runner.py [height width mines]
+if len(sys.argv) == 4:
+    HEIGHT, WIDTH, MINES = (int(arg) for arg in sys.argv[1:])
+elif len(sys.argv) == 1:
+    HEIGHT = 8
+    WIDTH = 8
+    MINES = 8
+else:
+    sys.exit("Usage: python runner.py [height width mines]")
+
+# Frame rate cap, and time per frame the AI may spend on autoplay moves
+FPS = 60
+AUTOPLAY_BUDGET = 0.008
 
 # Colors
 BLACK = (0, 0, 0)
@@ -17,12 +27,7 @@ WHITE = (255, 255, 255)
 pygame.init()
 size = width, height = 600, 400
 screen = pygame.display.set_mode(size)
-
-# Fonts
-OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
-smallFont = pygame.font.Font(OPEN_SANS, 20)
-mediumFont = pygame.font.Font(OPEN_SANS, 28)
-largeFont = pygame.font.Font(OPEN_SANS, 40)
+clock = pygame.time.Clock()
 
 # Compute board size
 BOARD_PADDING = 20
@@ -31,192 +36,302 @@ board_height = height - (BOARD_PADDING * 2)
 cell_size = int(min(board_width / WIDTH, board_height / HEIGHT))
 board_origin = (BOARD_PADDING, BOARD_PADDING)
 
+# Fonts, with the neighbor counts scaled to the cell size
+OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
+smallFont = pygame.font.Font(OPEN_SANS, 20)
+mediumFont = pygame.font.Font(OPEN_SANS, 28)
+largeFont = pygame.font.Font(OPEN_SANS, 40)
+cellFont = pygame.font.Font(OPEN_SANS, max(int(cell_size * 0.45), 6))
+
 # Add images
 flag = pygame.image.load("assets/images/flag.png")
 flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
-# Create game and AI agent
-game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+# Render each neighbor count once
+glyphs = [cellFont.render(str(n), True, BLACK) for n in range(9)]
+
+# Buttons
+panel = pygame.Rect((2 / 3) * width, 0, width / 3, height)
+button_width = (width / 3) - BOARD_PADDING * 2
+aiButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50, button_width, 50
+)
+autoButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 10, button_width, 50
+)
+resetButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 70, button_width, 50
+)
+buttonTexts = {
+    text: mediumFont.render(text, True, BLACK)
+    for text in ["AI Move", "Autoplay", "Stop", "Reset"]
+}
+statusTexts = {
+    text: mediumFont.render(text, True, WHITE)
+    for text in ["Lost", "Won", ""]
+}
+
+
+def cell_rect(cell):
+    """
+    Returns the rectangle on screen of a cell.
+    """
+    i, j = cell
+    return pygame.Rect(
+        board_origin[0] + j * cell_size,
+        board_origin[1] + i * cell_size,
+        cell_size, cell_size
+    )
+
+
+def cell_at(position):
+    """
+    Returns the cell at a position on screen, or None if there is none.
+    """
+    j = (position[0] - board_origin[0]) // cell_size
+    i = (position[1] - board_origin[1]) // cell_size
+    if 0 <= i < HEIGHT and 0 <= j < WIDTH:
+        return (i, j)
+    return None
+
+
+def draw_cell(cell):
+    """
+    Draws a cell with its mine, flag or number, and returns its rectangle.
+    """
+    rect = cell_rect(cell)
+    pygame.draw.rect(screen, GRAY, rect)
+    pygame.draw.rect(screen, WHITE, rect, max(cell_size // 15, 1))
+
+    if game.is_mine(cell) and lost:
+        screen.blit(mine, rect)
+    elif cell in flags:
+        screen.blit(flag, rect)
+    elif cell in revealed:
+        neighbors = glyphs[game.nearby_mines(cell)]
+        neighborsTextRect = neighbors.get_rect()
+        neighborsTextRect.center = rect.center
+        screen.blit(neighbors, neighborsTextRect)
+
+    return rect
+
+
+def draw_board():
+    """
+    Draws every cell, and returns the rectangle of the board.
+    """
+    for i in range(HEIGHT):
+        for j in range(WIDTH):
+            draw_cell((i, j))
+    return pygame.Rect(board_origin, (WIDTH * cell_size, HEIGHT * cell_size))
+
+
+def draw_panel():
+    """
+    Draws the buttons and game status, and returns the panel's rectangle.
+    """
+    pygame.draw.rect(screen, BLACK, panel)
+    for button, text in [
+        (aiButton, "AI Move"),
+        (autoButton, "Stop" if autoplay else "Autoplay"),
+        (resetButton, "Reset")
+    ]:
+        buttonText = buttonTexts[text]
+        buttonRect = buttonText.get_rect()
+        buttonRect.center = button.center
+        pygame.draw.rect(screen, WHITE, button)
+        screen.blit(buttonText, buttonRect)
+
+    text = statusTexts["Lost" if lost else "Won" if game.mines == flags else ""]
+    textRect = text.get_rect()
+    textRect.center = ((5 / 6) * width, (2 / 3) * height + 40)
+    screen.blit(text, textRect)
+    return panel
+
+
+def make_move(move):
+    """
+    Reveals a cell, flooding through cells with no nearby mines, and tells
+    the AI about every newly revealed cell. Returns the changed cells.
+
+    The chosen cell is always revealed, clearing any flag on it, but
+    flagged cells reached by the flood are left alone.
+    """
+    global lost
+    if game.is_mine(move):
+        lost = True
+        return []
+    flags.discard(move)
+    changed = [cell for cell in game.reveal(move)
+               if cell not in revealed and cell not in flags]
+    for cell in changed:
+        revealed.add(cell)
+        ai.add_knowledge(cell, game.nearby_mines(cell))
+    return changed
+
+
+def ai_move():
+    """
+    Makes one AI move, and returns the changed cells, or None if the AI
+    has no moves left to make, in which case its mines are flagged.
+    """
+    global flags
+    move = ai.make_safe_move()
+    if move is None:
+        move = ai.make_random_move()
+        if move is None:
+            flags = ai.mines.copy()
+            print("No moves left to make.")
+            return None
+        else:
+            print("No known safe moves, AI making random move.")
+    else:
+        print("AI making safe move.")
+    return make_move(move)
+
 
-# Keep track of revealed cells, flagged cells, and if a mine was hit
-revealed = set()
-flags = set()
-lost = False
+def reset():
+    """
+    Starts a new game and AI agent.
+    """
+    global game, ai, revealed, flags, lost, autoplay
+    game = ArrayMinesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+    ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+
+    # Keep track of revealed cells, flagged cells, and if a mine was hit
+    revealed = set()
+    flags = set()
+    lost = False
+    autoplay = False
+
+
+# Create game and AI agent
+reset()
+
+# Show game instructions until the play button is clicked
+screen.fill(BLACK)
+
+# Title
+title = largeFont.render("Play Minesweeper", True, WHITE)
+titleRect = title.get_rect()
+titleRect.center = ((width / 2), 50)
+screen.blit(title, titleRect)
+
+# Rules
+rules = [
+    "Click a cell to reveal it.",
+    "Right-click a cell to mark it as a mine.",
+    "Mark all mines successfully to win!"
+]
+for i, rule in enumerate(rules):
+    line = smallFont.render(rule, True, WHITE)
+    lineRect = line.get_rect()
+    lineRect.center = ((width / 2), 150 + 30 * i)
+    screen.blit(line, lineRect)
+
+# Play game button
+buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
+buttonText = mediumFont.render("Play Game", True, BLACK)
+buttonTextRect = buttonText.get_rect()
+buttonTextRect.center = buttonRect.center
+pygame.draw.rect(screen, WHITE, buttonRect)
+screen.blit(buttonText, buttonTextRect)
+pygame.display.flip()
 
-# Show instructions initially
 instructions = True
+while instructions:
+    event = pygame.event.wait()
+    if event.type == pygame.QUIT:
+        sys.exit()
+    if (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1
+            and buttonRect.collidepoint(event.pos)):
+        instructions = False
+
+# Draw the whole screen once; afterwards only changed areas are redrawn
+screen.fill(BLACK)
+draw_board()
+draw_panel()
+pygame.display.flip()
 
 while True:
 
-    # Check if game quit
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
-
-    screen.fill(BLACK)
-
-    # Show game instructions
-    if instructions:
-
-        # Title
-        title = largeFont.render("Play Minesweeper", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Rules
-        rules = [
-            "Click a cell to reveal it.",
-            "Right-click a cell to mark it as a mine.",
-            "Mark all mines successfully to win!"
-        ]
-        for i, rule in enumerate(rules):
-            line = smallFont.render(rule, True, WHITE)
-            lineRect = line.get_rect()
-            lineRect.center = ((width / 2), 150 + 30 * i)
-            screen.blit(line, lineRect)
-
-        # Play game button
-        buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
-        buttonTextRect = buttonText.get_rect()
-        buttonTextRect.center = buttonRect.center
-        pygame.draw.rect(screen, WHITE, buttonRect)
-        screen.blit(buttonText, buttonTextRect)
-
-        # Check if play button clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
-                instructions = False
-                time.sleep(0.3)
-
-        pygame.display.flip()
-        continue
-
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
+    # Sleep until the next event, unless the AI is playing on its own
+    events = pygame.event.get() if autoplay else [pygame.event.wait()]
 
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
-    textRect = text.get_rect()
-    textRect.center = ((5 / 6) * width, (2 / 3) * height)
-    screen.blit(text, textRect)
+    dirty = []
+    redraw_board = False
+    redraw_panel = False
 
-    move = None
-
-    left, _, right = pygame.mouse.get_pressed()
-
-    # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
-
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
-
-        # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
+    for event in events:
+        if event.type == pygame.QUIT:
+            sys.exit()
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            continue
+        mouse = event.pos
+        cell = cell_at(mouse)
+
+        # Right-click to toggle flagging
+        if event.button == 3 and not lost:
+            if cell is not None and cell not in revealed:
+                if cell in flags:
+                    flags.remove(cell)
                 else:
-                    print("No known safe moves, AI making random move.")
+                    flags.add(cell)
+                dirty.append(draw_cell(cell))
+                redraw_panel = True
+
+        elif event.button == 1:
+
+            # If AI button clicked, make an AI move
+            if aiButton.collidepoint(mouse) and not lost:
+                changed = ai_move()
+                for changed_cell in changed or []:
+                    dirty.append(draw_cell(changed_cell))
+                redraw_board = lost or changed is None
+                redraw_panel = True
+
+            # Toggle AI autoplay
+            elif autoButton.collidepoint(mouse) and not lost:
+                autoplay = not autoplay
+                redraw_panel = True
+
+            # Reset game state
+            elif resetButton.collidepoint(mouse):
+                reset()
+                redraw_board = True
+                redraw_panel = True
+
+            # User-made move
+            elif (not lost and cell is not None
+                    and cell not in flags and cell not in revealed):
+                for changed_cell in make_move(cell):
+                    dirty.append(draw_cell(changed_cell))
+                redraw_board = lost
+                redraw_panel = True
+
+    # Let the AI play for a bounded time each frame
+    if autoplay and not lost:
+        deadline = time.perf_counter() + AUTOPLAY_BUDGET
+        while autoplay and not lost and time.perf_counter() < deadline:
+            changed = ai_move()
+            if changed is None:
+                autoplay = False
+                redraw_board = True
             else:
-                print("AI making safe move.")
-            time.sleep(0.2)
-
-        # Reset game state
-        elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
-            flags = set()
-            lost = False
-            continue
-
-        # User-made move
-        elif not lost:
-            for i in range(HEIGHT):
-                for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
-
-    # Make move and update AI knowledge
-    if move:
-        if game.is_mine(move):
-            lost = True
-        else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
-
-    pygame.display.flip()
+                for changed_cell in changed:
+                    dirty.append(draw_cell(changed_cell))
+        redraw_board = redraw_board or lost
+        redraw_panel = True
+    if lost:
+        autoplay = False
+
+    if redraw_board:
+        dirty.append(draw_board())
+    if redraw_panel:
+        dirty.append(draw_panel())
+    if dirty:
+        pygame.display.update(dirty)
+
+    clock.tick(FPS)
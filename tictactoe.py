@@ -3,6 +3,9 @@ Tic Tac Toe Player
 """
 
 import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 
 X = "X"
@@ -187,3 +190,234 @@ def minimax(board):
                 opt_action = action
     
     return opt_action
+
+
+def alphabeta(board, alpha=float("-inf"), beta=float("inf")):
+    """
+    Returns the minimax value of the board, pruning branches that cannot
+    fall inside the (alpha, beta) window. Values outside the window are
+    bounds rather than exact values.
+    """
+
+    if terminal(board):
+        return utility(board)
+
+    if player(board) == X:
+        value = float("-inf")
+        for action in actions(board):
+            value = max(value, alphabeta(result(board, action), alpha, beta))
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+    else:
+        value = float("inf")
+        for action in actions(board):
+            value = min(value, alphabeta(result(board, action), alpha, beta))
+            beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+    return value
+
+
+# Exact values of finished root actions, shared with the worker processes
+_root_values = None
+
+
+def _init_root_worker(root_values):
+    global _root_values
+    _root_values = root_values
+
+
+def _root_bound(index, maximizing):
+    """
+    Returns the bound the root player is already guaranteed by the other
+    root actions that have finished. Actions after `index` only prune
+    strictly worse values, so ties still go to the earliest action,
+    as they do in `minimax`.
+    """
+
+    bound = float("-inf") if maximizing else float("inf")
+
+    for k, value in enumerate(_root_values):
+        if math.isnan(value) or k == index:
+            continue
+        if maximizing:
+            if k > index:
+                value = math.nextafter(value, float("-inf"))
+            bound = max(bound, value)
+        else:
+            if k > index:
+                value = math.nextafter(value, float("inf"))
+            bound = min(bound, value)
+
+    return bound
+
+
+def _search_root_action(index, board, maximizing):
+    """
+    Returns the value of the root action `index` that led to `board`,
+    re-reading the shared bound before every reply. The value is only
+    published to the other workers when it is exact.
+    """
+
+    if terminal(board):
+        value = utility(board)
+        _root_values[index] = value
+        return value
+
+    if maximizing:
+        value = float("inf")
+        for action in actions(board):
+            alpha = _root_bound(index, maximizing)
+            value = min(value, alphabeta(result(board, action), alpha, value))
+            if value <= alpha:
+                return value
+    else:
+        value = float("-inf")
+        for action in actions(board):
+            beta = _root_bound(index, maximizing)
+            value = max(value, alphabeta(result(board, action), value, beta))
+            if value >= beta:
+                return value
+
+    _root_values[index] = value
+    return value
+
+
+# Fewest empty cells for which `parallel_minimax` uses worker processes.
+# Smaller trees are searched serially, faster than a pool can hand them out
+PARALLEL_MIN_EMPTY = 8
+
+# Worker pools kept alive across calls, keyed by number of workers, each
+# with the shared array of root values its workers were started with
+_pools = dict()
+
+
+def _root_pool(workers):
+    """
+    Returns a process pool of `workers` workers and its shared array of
+    root values, starting them on the first call for that worker count.
+    """
+
+    if workers not in _pools:
+        root_values = multiprocessing.Array("d", [math.nan] * 9)
+        executor = ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_init_root_worker,
+                                       initargs=(root_values,))
+        _pools[workers] = (executor, root_values)
+    return _pools[workers]
+
+
+def shutdown_pools():
+    """
+    Shuts down the worker pools started by `parallel_minimax`.
+    """
+
+    for executor, _ in _pools.values():
+        executor.shutdown()
+    _pools.clear()
+
+
+def serial_minimax(board):
+    """
+    Returns the optimal action for the current player on the board,
+    searching the root actions in order with alpha-beta pruning.
+
+    Returns the same action as `minimax`.
+    """
+
+    if terminal(board):
+        return None
+
+    maximizing = player(board) == X
+    opt_action = None
+    opt_value = float("-inf") if maximizing else float("inf")
+
+    for action in actions(board):
+        if maximizing:
+            value = alphabeta(result(board, action), opt_value, float("inf"))
+            better = value > opt_value
+        else:
+            value = alphabeta(result(board, action), float("-inf"), opt_value)
+            better = value < opt_value
+        if better or opt_action is None:
+            opt_value = value
+            opt_action = action
+
+    return opt_action
+
+
+def parallel_minimax(board, workers=None):
+    """
+    Returns the optimal action for the current player on the board,
+    evaluating each root action in a pool of worker processes that is
+    reused by later calls with the same number of workers.
+
+    Boards with fewer than PARALLEL_MIN_EMPTY empty cells, and calls with
+    a single worker, are searched serially. On a 3x3 board even the empty
+    board takes well under a second serially, so the pool only pays off
+    with several free cores; on one core it is slower than `serial_minimax`.
+
+    Returns the same action as `minimax`.
+    """
+
+    root_actions = list(actions(board))
+
+    if terminal(board) or not root_actions:
+        return None
+
+    if workers == 1 or len(root_actions) < PARALLEL_MIN_EMPTY:
+        return serial_minimax(board)
+
+    maximizing = player(board) == X
+    executor, root_values = _root_pool(workers)
+    for index in range(len(root_values)):
+        root_values[index] = math.nan
+
+    futures = [
+        executor.submit(_search_root_action, index,
+                        result(board, action), maximizing)
+        for index, action in enumerate(root_actions)
+    ]
+    values = [future.result() for future in futures]
+
+    opt_action = root_actions[0]
+    opt_value = values[0]
+
+    for action, value in zip(root_actions, values):
+        if (value > opt_value) if maximizing else (value < opt_value):
+            opt_value = value
+            opt_action = action
+
+    return opt_action
+
+
+def benchmark_minimax(board=None, worker_counts=(1, 2, 4, 8)):
+    """
+    Times `parallel_minimax` on the board for each number of workers, once
+    its pool has started, and returns a dictionary mapping the worker count
+    to seconds taken, and "serial" to the seconds `serial_minimax` took.
+    """
+
+    if board is None:
+        board = initial_state()
+
+    expected = minimax(board)
+
+    start = time.perf_counter()
+    action = serial_minimax(board)
+    timings = {"serial": time.perf_counter() - start}
+    if action != expected:
+        raise Exception("Serial search disagrees with minimax")
+
+    for workers in worker_counts:
+        parallel_minimax(board, workers)
+        start = time.perf_counter()
+        action = parallel_minimax(board, workers)
+        timings[workers] = time.perf_counter() - start
+        if action != expected:
+            raise Exception("Parallel search disagrees with minimax")
+
+    shutdown_pools()
+    return timings